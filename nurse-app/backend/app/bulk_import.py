@@ -0,0 +1,218 @@
+# このファイルは過去データ（注射実施・看護計画）の一括インポート処理を定義します
+
+import csv
+import hashlib
+import json
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterator, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.import_job import ImportJob
+from app.models.injection import Injection
+from app.models.nursing_plan import NursingPlan
+from app.patient_directory import patient_directory
+from app.schemas.injection import InjectionCreate
+from app.schemas.nursing_plan import NursingPlanCreate
+from app.sync import next_change_seq
+
+# インポート対象ごとのモデルと検証スキーマ
+IMPORT_TARGETS = {
+    "injections": (Injection, InjectionCreate),
+    "nursing-plans": (NursingPlan, NursingPlanCreate),
+}
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+class ImportResult:
+    """インポート結果"""
+
+    def __init__(self, job_name: str, target: str):
+        self.job_name = job_name
+        self.target = target
+        self.last_record = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.completed = False
+
+    def to_dict(self) -> dict:
+        return {
+            "job_name": self.job_name,
+            "target": self.target,
+            "last_record": self.last_record,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+            "completed": self.completed,
+        }
+
+def detect_format(filename: str) -> str:
+    """ファイル名から形式を判定する"""
+    if filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def _normalize(raw: dict) -> dict:
+    """CSV由来の値をスキーマで検証できる形に整える"""
+    record = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                value = None
+        record[key.strip()] = value
+    interventions = record.get("interventions")
+    if isinstance(interventions, str):
+        # JSON配列、または「|」区切りの文字列を受け付ける
+        if interventions.startswith("["):
+            try:
+                record["interventions"] = json.loads(interventions)
+            except json.JSONDecodeError as e:
+                # 1レコードの不正でインポート全体を止めないよう、そのレコードだけを不正として扱う
+                record["__error__"] = f"interventionsのJSONの形式が正しくありません: {e}"
+        else:
+            record["interventions"] = [item.strip() for item in interventions.split("|") if item.strip()]
+    return record
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """ファイルを1レコードずつ読み込み、(レコード番号, 値)を返す"""
+    if fmt == "csv":
+        for number, raw in enumerate(csv.DictReader(stream), start=1):
+            yield number, _normalize(raw)
+    elif fmt == "ndjson":
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, {"__error__": f"JSONの形式が正しくありません: {e}"}
+                continue
+            yield number, _normalize(raw) if isinstance(raw, dict) else {"__error__": "オブジェクトではありません"}
+    else:
+        raise ValueError(f"形式は以下のいずれかである必要があります: {', '.join(IMPORT_FORMATS)}")
+
+def default_job_name(target: str, filename: str, binary: BinaryIO) -> str:
+    """ジョブ名の指定がない場合のジョブ名（対象・ファイル名・内容のハッシュ）を返す
+
+    同じ名前で内容の異なるファイルが、完了済みのジョブを再利用して何も取り込まれないことを防ぐ。
+    内容を読み終えたらストリームを先頭に戻す。
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: binary.read(1024 * 1024), b""):
+        digest.update(block)
+    binary.seek(0)
+    return f"{target}:{filename}:{digest.hexdigest()[:16]}"
+
+def get_or_create_job(db: Session, job_name: str, target: str) -> ImportJob:
+    """チェックポイントを取得する（存在しない場合は作成する）"""
+    job = db.query(ImportJob).filter(ImportJob.name == job_name).first()
+    if job is None:
+        job = ImportJob(name=job_name, target=target, last_record=0, inserted_count=0,
+                        rejected_count=0, completed=False, created_at=datetime.now())
+        db.add(job)
+        db.commit()
+    elif job.target != target:
+        raise ValueError(f"ジョブ {job_name} は {job.target} のインポートに使用されています")
+    return job
+
+def run_import(
+    db: Session,
+    stream: TextIO,
+    target: str,
+    fmt: str,
+    user_id: int,
+    job_name: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_reject: Optional[Callable[[int, dict, str], None]] = None,
+    on_progress: Optional[Callable[[ImportResult], None]] = None,
+) -> ImportResult:
+    """ファイルを検証しながらチャンク単位でインポートする
+
+    各チャンクの挿入とチェックポイントの更新は同じトランザクションでコミットされるため、
+    中断後に同じジョブ名で再実行すると、取り込み済みのレコードを読み飛ばして再開できる。
+    """
+    if target not in IMPORT_TARGETS:
+        raise ValueError(f"インポート対象は以下のいずれかである必要があります: {', '.join(IMPORT_TARGETS)}")
+    model, schema = IMPORT_TARGETS[target]
+    table = model.__table__
+
+    job = get_or_create_job(db, job_name, target)
+    result = ImportResult(job_name, target)
+    result.last_record = job.last_record
+    result.inserted = job.inserted_count
+    result.rejected = job.rejected_count
+    if job.completed:
+        result.completed = True
+        return result
+
+    rows = []
+    chunk_rejected = 0
+
+    def flush(last_record: int):
+        nonlocal rows, chunk_rejected
+        if rows:
+            if "change_seq" in table.c:
+                # チャンク分の変更連番をまとめて採番する
+                first = next_change_seq(db, table.name, len(rows))
+                for offset, row in enumerate(rows):
+                    row["change_seq"] = first + offset
+            db.execute(insert(table), rows)
+        job.last_record = last_record
+        job.inserted_count += len(rows)
+        job.rejected_count += chunk_rejected
+        job.updated_at = datetime.now()
+        db.commit()
+        result.last_record = last_record
+        result.inserted = job.inserted_count
+        result.rejected = job.rejected_count
+        rows = []
+        chunk_rejected = 0
+        if on_progress:
+            on_progress(result)
+
+    number = job.last_record
+    for number, raw in iter_records(stream, fmt):
+        if number <= job.last_record:
+            result.skipped += 1
+            continue
+        try:
+            if "__error__" in raw:
+                raise ValueError(raw.pop("__error__"))
+            record = schema(**raw)
+            if patient_directory.get(db, record.patient_id) is None:
+                # 患者コードの外部キー違反でチャンク全体が失敗しないよう、レコード単位で不正とする
+                raise ValueError(f"患者 {record.patient_id} が見つかりません")
+        except (ValidationError, ValueError, TypeError) as e:
+            chunk_rejected += 1
+            if on_reject:
+                on_reject(number, raw, str(e))
+        else:
+            rows.append({**record.dict(), "created_by_id": user_id, "created_at": datetime.now()})
+        if len(rows) + chunk_rejected >= chunk_size:
+            flush(number)
+
+    flush(number)
+    job.completed = True
+    db.commit()
+    result.completed = True
+    return result
+
+class RejectFileWriter:
+    """不正なレコードをNDJSON形式で書き出す"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def __call__(self, number: int, raw: dict, error: str):
+        self.stream.write(json.dumps({"record": number, "error": error, "data": raw},
+                                     ensure_ascii=False, default=str) + "\n")
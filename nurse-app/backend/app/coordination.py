@@ -0,0 +1,78 @@
+# このファイルは複数ワーカー起動時の一度きりのタスク調整を定義します
+
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windowsではファイルロックを使わず単一プロセスとして扱う
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ロックファイルの置き場所（同一ホスト上のワーカー間で共有される必要がある）
+LOCK_DIR = os.getenv("APP_LOCK_DIR", tempfile.gettempdir())
+
+_leader_lock_file = None
+_background_tasks = []
+_stop_event = threading.Event()
+
+def _lock_path(name: str) -> str:
+    return os.path.join(LOCK_DIR, f"nurse_app_{name}.lock")
+
+@contextmanager
+def process_lock(name: str):
+    """プロセス間の排他ロックを取得する（同時に1プロセスだけが処理を実行する）"""
+    if fcntl is None:
+        yield
+        return
+    with open(_lock_path(name), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def try_become_leader() -> bool:
+    """リーダーワーカーの座を取得する
+
+    ロックはプロセス終了時にOSが解放するため、リーダーがリサイクルされた場合は
+    次に起動したワーカーがリーダーを引き継ぐ。
+    """
+    global _leader_lock_file
+    if _leader_lock_file is not None or fcntl is None:
+        return True
+    lock_file = open(_lock_path("leader"), "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _leader_lock_file = lock_file
+    return True
+
+def register_background_task(func):
+    """リーダーワーカーでのみ実行するバックグラウンドタスクを登録する
+
+    タスクは停止イベントを引数に受け取り、イベントがセットされたら終了すること。
+    """
+    _background_tasks.append(func)
+    return func
+
+def start_background_tasks() -> bool:
+    """リーダーであれば登録済みのバックグラウンドタスクを起動する"""
+    if not _background_tasks or not try_become_leader():
+        return False
+    _stop_event.clear()
+    for func in _background_tasks:
+        thread = threading.Thread(target=func, args=(_stop_event,), name=func.__name__, daemon=True)
+        thread.start()
+        logger.info("バックグラウンドタスクを起動しました: %s (pid=%s)", func.__name__, os.getpid())
+    return True
+
+def stop_background_tasks():
+    """バックグラウンドタスクに停止を通知する"""
+    _stop_event.set()
@@ -0,0 +1,82 @@
+# このファイルはルーター間で共有する書き込み処理を定義します
+#
+# いずれの関数も書き込みとレスポンス用の行の取得を1文（RETURNING）で行い、
+# コミット後のdb.refresh()による再SELECTを不要にします。コミットは呼び出し側で行います。
+# 差分同期の対象テーブル（change_seqカラムを持つもの）では、変更連番の採番が1文加わります。
+
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.sync import next_change_seq, record_tombstone
+
+def _stamp_change(db: Session, table, values: dict) -> dict:
+    """差分同期の対象テーブルでは変更連番を採番して値に加える"""
+    if "change_seq" in table.c:
+        return {**values, "change_seq": next_change_seq(db, table.name)}
+    return values
+
+def insert_returning(db: Session, model, values: dict) -> dict:
+    """INSERT ... RETURNING * を実行し、挿入した行を返す"""
+    table = model.__table__
+    statement = insert(table).values(**_stamp_change(db, table, values))
+    if db.get_bind().dialect.insert_returning:
+        return dict(db.execute(statement.returning(*table.c)).mappings().one())
+
+    # RETURNING非対応のDBでは、送信した値（Python側のデフォルト値を含む）と採番されたキーから行を組み立てる
+    result = db.execute(statement)
+    row = {column.name: None for column in table.c}
+    row.update(result.last_inserted_params())
+    row.update(zip([column.name for column in table.primary_key], result.inserted_primary_key))
+    return row
+
+def conditional_update(
+    db: Session,
+    model,
+    record_id,
+    values: dict,
+    allowed_statuses: Optional[Iterable[str]] = None,
+    expected_version: Optional[int] = None,
+    key: str = "id",
+) -> Optional[dict]:
+    """条件付きUPDATEを1文で実行し、更新後の行を返す
+
+    UPDATE ... WHERE id = :id AND status IN (...) AND version = :version RETURNING *
+    として実行するため、状態の確認と更新の間に他のリクエストが割り込む余地がない。
+    バージョン列を持つモデルではバージョンを1つ進める。keyでid以外の一意なカラムを指定できる。
+    条件に一致する行がなかった場合はNoneを返す。
+    """
+    table = model.__table__
+    statement = update(table).where(table.c[key] == record_id)
+    if allowed_statuses is not None:
+        statement = statement.where(table.c.status.in_(list(allowed_statuses)))
+    if expected_version is not None:
+        statement = statement.where(table.c.version == expected_version)
+    if "version" in table.c:
+        values = {**values, "version": table.c.version + 1}
+    statement = statement.values(**_stamp_change(db, table, values))
+
+    if db.get_bind().dialect.update_returning:
+        row = db.execute(statement.returning(*table.c)).mappings().first()
+    else:
+        # RETURNING非対応のDBでは更新件数を確認してから読み直す
+        if db.execute(statement).rowcount == 0:
+            return None
+        row = db.execute(select(*table.c).where(table.c[key] == record_id)).mappings().first()
+    return dict(row) if row else None
+
+def delete_by_id(db: Session, model, record_id: int) -> bool:
+    """DELETEを1文で実行し、削除できたかどうかを返す
+
+    差分同期の対象テーブルでは、削除を端末へ伝えるための記録を同じトランザクションで残す。
+    """
+    table = model.__table__
+    deleted = db.execute(delete(table).where(table.c.id == record_id)).rowcount > 0
+    if deleted and "change_seq" in table.c:
+        record_tombstone(db, table.name, record_id)
+    return deleted
+
+def current_state(db: Session, model, record_id: int):
+    """状態遷移に失敗した理由を判定するため、現在の状態とバージョンを取得する"""
+    return db.query(model.status, model.version).filter(model.id == record_id).first()
@@ -1,11 +1,16 @@
 # このファイルはデータベース接続設定を含みます
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, inspect, literal, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import logging
 import os
 from dotenv import load_dotenv
 
+from app.coordination import process_lock
+
+logger = logging.getLogger(__name__)
+
 # 環境変数の読み込み
 load_dotenv()
 
@@ -24,6 +29,66 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # モデルのベースクラス
 Base = declarative_base()
 
+# テーブルの作成
+def init_db():
+    """テーブルを作成し、既存のテーブルを現在のモデルに合わせる（複数ワーカーから同時に呼ばれても1プロセスずつ実行される）"""
+    with process_lock("schema"):
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            upgrade_schema(connection)
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        rendered = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {rendered}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+def _backfill_change_seq(connection, table):
+    """既存の行に変更連番を振り、初回の差分同期で取得されるようにする"""
+    connection.execute(table.update().where(table.c.change_seq.is_(None)).values(change_seq=table.c.id))
+    max_seq = connection.execute(select(func.max(table.c.change_seq))).scalar()
+    if not max_seq:
+        return
+    counters = Base.metadata.tables["sync_counters"]
+    updated = connection.execute(
+        counters.update()
+        .where(counters.c.name == table.name, counters.c.value < max_seq)
+        .values(value=max_seq)
+    ).rowcount
+    exists = connection.execute(select(counters.c.name).where(counters.c.name == table.name)).first()
+    if not updated and exists is None:
+        connection.execute(counters.insert().values(name=table.name, value=max_seq))
+
+def upgrade_schema(connection):
+    """既存のテーブルに不足しているカラムとインデックスを追加する（何度実行してもよい）
+
+    create_all は既存のテーブルを変更しないため、以前のバージョンで作成されたデータベースに
+    後から追加したカラム（version, change_seq など）とインデックスをここで追加する。
+    外部キー制約は既存の行が満たしているとは限らないため追加しない。
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns or column.primary_key:
+                continue
+            connection.execute(text(f"ALTER TABLE {table.name} {_column_ddl(column, connection.dialect)}"))
+            logger.info("カラムを追加しました: %s.%s", table.name, column.name)
+            if column.name == "change_seq":
+                _backfill_change_seq(connection, table)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                logger.info("インデックスを追加しました: %s", index.name)
+
 # データベースセッションの依存関係
 def get_db():
     db = SessionLocal()
@@ -35,6 +35,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def get_token_subject(token: str) -> Optional[str]:
+    """トークンからユーザー名を取り出す（無効なトークンの場合はNoneを返す）"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """現在のユーザーを取得する"""
     credentials_exception = HTTPException(
@@ -59,4 +67,10 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     """現在のアクティブなユーザーを取得する"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="ユーザーは無効化されています")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    """現在の管理者ユーザーを取得する"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="管理者権限が必要です")
+    return current_user
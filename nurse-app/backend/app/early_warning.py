@@ -0,0 +1,243 @@
+# このファイルはNEWS2に準じた早期警告スコアの計算を定義します
+#
+# 患者ごとに各バイタル項目の最新値と点数をメモリに保持し、測定値が追加されるたびに
+# その項目の点数だけを計算し直して合計します（履歴を問い合わせ直さない）。
+#
+# 他のワーカーで登録された測定値は、処理済みの最大IDより大きい行を読むことで取り込みます。
+# 最大IDより小さいIDが後からコミットされる場合に備え、飛ばしたIDはしばらく問い合わせ続けます。
+# スコアの変化の記録は、測定値を登録したワーカーだけが行います。
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.models.early_warning import EarlyWarningScore
+from app.models.vital_signs import VitalSign
+from app.patient_directory import patient_directory
+
+logger = logging.getLogger(__name__)
+
+# 起動時に状態を復元する際に読み込む期間（時間）
+LOOKBACK_HOURS = int(os.getenv("EWS_LOOKBACK_HOURS", "72"))
+# 処理済みの最大IDより小さく未コミットのIDを待つ時間（秒）。これを過ぎたIDはロールバックされたものとみなす
+PENDING_SECONDS = int(os.getenv("EWS_PENDING_SECONDS", "60"))
+# 測定の途絶えた患者の状態を破棄する間隔（秒）
+PRUNE_SECONDS = int(os.getenv("EWS_PRUNE_SECONDS", "300"))
+
+# 各項目の点数表（上限値以下なら点数、の順に並べる。最後は上限なし）
+SCORE_BANDS = {
+    "respiration": [(8, 3), (11, 1), (20, 0), (24, 2), (None, 3)],
+    "spo2": [(91, 3), (93, 2), (95, 1), (None, 0)],
+    "blood_pressure_systolic": [(90, 3), (100, 2), (110, 1), (219, 0), (None, 3)],
+    "pulse": [(40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (None, 3)],
+    "temperature": [(35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (None, 2)],
+    # 意識レベル（0: 清明、1以上: 新たな混乱・声/痛みへの反応・無反応）
+    "consciousness": [(0, 0), (None, 3)],
+    # 酸素投与（0: 室内気、1: 酸素投与中）
+    "supplemental_oxygen": [(0, 0), (None, 2)],
+}
+
+# リスク区分（高い順）
+RISK_HIGH = "high"
+RISK_MEDIUM = "medium"
+RISK_LOW_MEDIUM = "low_medium"
+RISK_LOW = "low"
+RISK_ORDER = {RISK_HIGH: 3, RISK_MEDIUM: 2, RISK_LOW_MEDIUM: 1, RISK_LOW: 0}
+
+def parameter_score(vital_type: str, value: float) -> Optional[int]:
+    """1項目の点数を返す（スコアの対象外の項目はNone）"""
+    bands = SCORE_BANDS.get(vital_type)
+    if bands is None:
+        return None
+    for upper, score in bands:
+        if upper is None or value <= upper:
+            return score
+
+def risk_level(total: int, components: Dict[str, int]) -> str:
+    if total >= 7:
+        return RISK_HIGH
+    if total >= 5:
+        return RISK_MEDIUM
+    if any(score == 3 for score in components.values()):
+        return RISK_LOW_MEDIUM
+    return RISK_LOW
+
+class PatientScore:
+    """患者1人分の最新値と点数"""
+    __slots__ = ("patient_id", "latest", "components", "total", "risk", "updated_at")
+
+    def __init__(self, patient_id: int):
+        self.patient_id = patient_id
+        self.latest: Dict[str, tuple] = {}  # 項目 -> (値, 測定日時)
+        self.components: Dict[str, int] = {}
+        self.total = 0
+        self.risk = RISK_LOW
+        self.updated_at: Optional[datetime] = None
+
+    def apply(self, vital_type: str, value: float, measured_at: datetime) -> bool:
+        """測定値を反映し、スコアまたはリスク区分が変わった場合はTrueを返す"""
+        score = parameter_score(vital_type, value)
+        if score is None:
+            return False
+        current = self.latest.get(vital_type)
+        if current is not None and current[1] > measured_at:
+            # 後から登録された過去の測定値は最新値を置き換えない
+            return False
+        self.latest[vital_type] = (value, measured_at)
+        self.updated_at = max(self.updated_at or measured_at, measured_at)
+        previous = (self.total, self.risk)
+        self.total += score - self.components.get(vital_type, 0)
+        self.components[vital_type] = score
+        self.risk = risk_level(self.total, self.components)
+        return (self.total, self.risk) != previous
+
+    def to_dict(self) -> dict:
+        return {
+            "score": self.total,
+            "risk": self.risk,
+            "components": dict(self.components),
+            "latest": {vital_type: value for vital_type, (value, _) in self.latest.items()},
+            "last_observed_at": self.updated_at,
+        }
+
+class EarlyWarningEngine:
+    """患者ごとの早期警告スコアをワーカープロセス内に保持する"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores: Dict[int, PatientScore] = {}
+        self._last_vital_id = 0
+        self._pending: Dict[int, float] = {}  # 処理済みの最大IDより小さい未処理のID -> 検出時刻
+        self._loaded = False
+        self._pruned_at = 0.0
+
+    def _apply_row(self, row) -> Optional[PatientScore]:
+        if parameter_score(row.vital_type, row.value) is None:
+            # スコアの対象外の項目（拡張期血圧など）では患者の状態を作らない
+            return None
+        state = self._scores.get(row.patient_id)
+        if state is None:
+            state = self._scores[row.patient_id] = PatientScore(row.patient_id)
+        return state if state.apply(row.vital_type, row.value, row.timestamp) else None
+
+    def _advance(self, new_last_id: int, seen, now: float):
+        """処理済みの最大IDを進め、飛ばしたID（未コミットの可能性がある行）を記録する"""
+        for vital_id in range(self._last_vital_id + 1, new_last_id):
+            if vital_id not in seen:
+                self._pending[vital_id] = now
+        self._last_vital_id = max(self._last_vital_id, new_last_id)
+
+    def _vital_rows(self, db: Session, *filters):
+        return db.query(
+            VitalSign.id, VitalSign.patient_id, VitalSign.vital_type, VitalSign.value, VitalSign.timestamp
+        ).filter(*filters).order_by(VitalSign.timestamp, VitalSign.id)
+
+    def _sync(self, db: Session, exclude_id: Optional[int] = None):
+        """状態を最新にする（ロックを取得した状態で呼ぶ）
+
+        初回のみ直近の測定値から状態を作り、以降は処理済みの最大IDより大きい行と、
+        追い越して後からコミットされうるIDの行だけを取り込む（履歴を読み直さない）。
+        """
+        now = time.monotonic()
+        if not self._loaded:
+            self._last_vital_id = db.query(func.max(VitalSign.id)).scalar() or 0
+            since = datetime.now() - timedelta(hours=LOOKBACK_HOURS)
+            filters = [VitalSign.timestamp >= since]
+            if exclude_id is not None:
+                filters.append(VitalSign.id != exclude_id)
+            for row in self._vital_rows(db, *filters):
+                self._apply_row(row)
+            self._loaded = True
+            self._pruned_at = now
+            return
+
+        condition = VitalSign.id > self._last_vital_id
+        if self._pending:
+            condition = or_(condition, VitalSign.id.in_(list(self._pending)))
+        filters = [condition]
+        if exclude_id is not None:
+            filters.append(VitalSign.id != exclude_id)
+        seen = set()
+        for row in self._vital_rows(db, *filters):
+            seen.add(row.id)
+            self._pending.pop(row.id, None)
+            self._apply_row(row)
+        if exclude_id is not None:
+            seen.add(exclude_id)
+        if seen:
+            self._advance(max(seen), seen, now)
+
+        # 一定時間現れないIDはロールバックされたものとみなす
+        for vital_id in [vital_id for vital_id, found in self._pending.items() if now - found > PENDING_SECONDS]:
+            del self._pending[vital_id]
+        if now - self._pruned_at >= PRUNE_SECONDS:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """最新の測定が復元期間より古い患者（退院した患者など）の状態を破棄する"""
+        cutoff = datetime.now() - timedelta(hours=LOOKBACK_HOURS)
+        for patient_id in [patient_id for patient_id, state in self._scores.items() if state.updated_at < cutoff]:
+            del self._scores[patient_id]
+        self._pruned_at = now
+
+    def record(self, db: Session, vital: dict):
+        """登録された測定値を反映し、スコアが変わった場合は記録する（コミットは呼び出し側で行う）"""
+        with self._lock:
+            self._sync(db, exclude_id=vital["id"])
+            state = self._apply_row(_Row(vital))
+            self._advance(vital["id"], {vital["id"]}, time.monotonic())
+            if state is None:
+                return
+            snapshot = (state.total, state.risk, dict(state.components))
+        score, risk, components = snapshot
+        db.execute(insert(EarlyWarningScore.__table__).values(
+            patient_id=vital["patient_id"],
+            score=score,
+            risk=risk,
+            components=json.dumps(components),
+            vital_sign_id=vital["id"],
+            calculated_at=datetime.now(),
+        ))
+
+    def patient(self, db: Session, patient_id: int) -> Optional[dict]:
+        """患者の現在のスコアを返す"""
+        with self._lock:
+            self._sync(db)
+            state = self._scores.get(patient_id)
+            return state.to_dict() if state else None
+
+    def ward_ranking(self, db: Session, ward: str, limit: int) -> List[dict]:
+        """病棟の入院中の患者をスコアの高い順に返す（測定値のない患者は含めない）"""
+        entries = patient_directory.list(db, ward=ward, active_only=True)
+        with self._lock:
+            self._sync(db)
+            ranked = [
+                {**entry.to_dict(), **state.to_dict()}
+                for entry, state in ((entry, self._scores.get(entry.id)) for entry in entries)
+                if state is not None
+            ]
+        ranked.sort(key=lambda item: (
+            RISK_ORDER[item["risk"]], item["score"], item["last_observed_at"]
+        ), reverse=True)
+        return ranked[:limit]
+
+class _Row:
+    """登録直後の測定値（dict）を問い合わせ結果の行と同じ形で扱う"""
+    __slots__ = ("id", "patient_id", "vital_type", "value", "timestamp")
+
+    def __init__(self, vital: dict):
+        self.id = vital["id"]
+        self.patient_id = vital["patient_id"]
+        self.vital_type = vital["vital_type"]
+        self.value = vital["value"]
+        self.timestamp = vital["timestamp"]
+
+# ワーカープロセス内で共有する早期警告スコア
+early_warning_engine = EarlyWarningEngine()
@@ -0,0 +1,44 @@
+# このファイルは一覧・詳細エンドポイントで取得フィールドを絞り込むための処理を定義します
+
+from datetime import date, datetime
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+def parse_fields(fields: Optional[str], schema) -> Optional[List[str]]:
+    """fieldsパラメータ（カンマ区切り）を検証し、取得するフィールドの一覧を返す
+
+    指定がない場合はNoneを返す。idは常に先頭に含める。
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不明なフィールドです: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *requested]))
+
+def field_columns(model, fields: List[str]):
+    """フィールド名に対応するモデルのカラムを返す"""
+    return [getattr(model, field) for field in fields]
+
+def _encode_value(value):
+    # jsonable_encoderは汎用で遅いため、カラムの値として現れる型だけを変換する
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def _encode_row(row) -> dict:
+    return {key: _encode_value(value) for key, value in row._mapping.items()}
+
+def fields_response(rows, many: bool = True) -> JSONResponse:
+    """カラム指定で取得した行をそのままJSONレスポンスにする"""
+    if many:
+        content = [_encode_row(row) for row in rows]
+    else:
+        content = _encode_row(rows)
+    return JSONResponse(content)
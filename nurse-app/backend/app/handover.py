@@ -0,0 +1,386 @@
+# このファイルは勤務交代時の申し送りレポートの生成と配信を定義します
+#
+# レポートはリーダーワーカーのバックグラウンドタスクが勤務帯の開始前にプロセスプールで生成して
+# handover_reportsテーブルに保存し、リクエスト時は保存済みの内容をそのまま返します。
+# 生成後に注射実施・看護計画・バイタルサインが変更・削除された場合や、患者が転棟・退院した場合は、
+# 該当する病棟だけを再生成します。
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.coordination import register_background_task
+from app.database import SessionLocal
+from app.models.handover_report import HandoverReport, HandoverReportItem
+from app.models.injection import Injection
+from app.models.nursing_plan import NursingPlan
+from app.models.patient import Patient
+from app.models.sync import SyncTombstone
+from app.models.vital_signs import VitalSign
+from app.patient_directory import patient_directory
+from app.schemas.injection import InjectionStatus
+from app.schemas.nursing_plan import NursingPlanStatus
+
+logger = logging.getLogger(__name__)
+
+# 勤務帯の開始時刻（カンマ区切り）
+SHIFT_BOUNDARIES = sorted(
+    time.fromisoformat(value.strip())
+    for value in os.getenv("HANDOVER_SHIFT_BOUNDARIES", "08:30,16:30,00:30").split(",")
+)
+# 勤務帯の開始何分前からレポートを生成するか
+LEAD_MINUTES = int(os.getenv("HANDOVER_LEAD_MINUTES", "30"))
+# 変更を確認する間隔（秒）
+POLL_SECONDS = int(os.getenv("HANDOVER_POLL_SECONDS", "60"))
+# 目標日が何日以内の看護計画を申し送りに含めるか
+PLAN_TARGET_DAYS = int(os.getenv("HANDOVER_PLAN_TARGET_DAYS", "2"))
+# レポート生成に使うプロセス数
+POOL_SIZE = int(os.getenv("HANDOVER_WORKERS", "2"))
+
+def shift_start_at(at: datetime) -> datetime:
+    """指定時刻を含む勤務帯の開始時刻を返す"""
+    candidates = [
+        datetime.combine(at.date() + timedelta(days=offset), boundary)
+        for offset in (-1, 0)
+        for boundary in SHIFT_BOUNDARIES
+    ]
+    return max(candidate for candidate in candidates if candidate <= at)
+
+def next_shift_start(at: datetime) -> datetime:
+    """指定時刻より後に始まる勤務帯の開始時刻を返す"""
+    candidates = [
+        datetime.combine(at.date() + timedelta(days=offset), boundary)
+        for offset in (0, 1)
+        for boundary in SHIFT_BOUNDARIES
+    ]
+    return min(candidate for candidate in candidates if candidate > at)
+
+def previous_shift_start(shift_start: datetime) -> datetime:
+    return shift_start_at(shift_start - timedelta(seconds=1))
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def build_reports(db: Session, shift_start: datetime, wards: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    """勤務帯の申し送りレポートを病棟ごとに作成する
+
+    病棟数によらず、注射実施・看護計画・バイタルサインをそれぞれ1回ずつ問い合わせる。
+    """
+    shift_end = next_shift_start(shift_start)
+    previous_start = previous_shift_start(shift_start)
+    patients = [entry for entry in patient_directory.list(db, active_only=True)
+                if wards is None or entry.ward in wards]
+    if not patients:
+        return {}
+
+    sections = {}
+    by_code, by_id = {}, {}
+    for entry in patients:
+        sections[entry.patient_code] = {
+            "patient_code": entry.patient_code,
+            "name": entry.name,
+            "bed": entry.bed,
+            "pending_injections": [],
+            "overdue_injections": [],
+            "plans_near_target": [],
+            "abnormal_vitals": [],
+        }
+        by_code[entry.patient_code] = entry
+        by_id[entry.id] = entry
+
+    injections = db.query(
+        Injection.id, Injection.patient_id, Injection.medication, Injection.dose,
+        Injection.route, Injection.scheduled_time
+    ).filter(
+        Injection.patient_id.in_(list(by_code)),
+        Injection.status == InjectionStatus.SCHEDULED.value,
+        Injection.scheduled_time < shift_end,
+    ).order_by(Injection.scheduled_time).all()
+    for row in injections:
+        item = {"id": row.id, "medication": row.medication, "dose": row.dose,
+                "route": row.route, "scheduled_time": _iso(row.scheduled_time)}
+        key = "overdue_injections" if row.scheduled_time < shift_start else "pending_injections"
+        sections[row.patient_id][key].append(item)
+
+    plans = db.query(
+        NursingPlan.id, NursingPlan.patient_id, NursingPlan.problem, NursingPlan.target_date
+    ).filter(
+        NursingPlan.patient_id.in_(list(by_code)),
+        NursingPlan.status == NursingPlanStatus.ACTIVE.value,
+        NursingPlan.target_date < shift_start + timedelta(days=PLAN_TARGET_DAYS),
+    ).order_by(NursingPlan.target_date).all()
+    for row in plans:
+        sections[row.patient_id]["plans_near_target"].append(
+            {"id": row.id, "problem": row.problem, "target_date": _iso(row.target_date)})
+
+    vitals = db.query(
+        VitalSign.id, VitalSign.patient_id, VitalSign.vital_type, VitalSign.value,
+        VitalSign.unit, VitalSign.timestamp
+    ).filter(
+        VitalSign.patient_id.in_(list(by_id)),
+        VitalSign.is_abnormal.is_(True),
+        VitalSign.timestamp >= previous_start,
+        VitalSign.timestamp < shift_start,
+    ).order_by(VitalSign.timestamp).all()
+    for row in vitals:
+        sections[by_id[row.patient_id].patient_code]["abnormal_vitals"].append(
+            {"id": row.id, "vital_type": row.vital_type, "value": row.value,
+             "unit": row.unit, "timestamp": _iso(row.timestamp)})
+
+    reports = {}
+    for entry in patients:
+        report = reports.setdefault(entry.ward, {
+            "ward": entry.ward,
+            "shift_start": _iso(shift_start),
+            "shift_end": _iso(shift_end),
+            "patients": [],
+            "summary": {"pending_injections": 0, "overdue_injections": 0,
+                        "plans_near_target": 0, "abnormal_vitals": 0},
+        })
+        section = sections[entry.patient_code]
+        report["patients"].append(section)
+        for key in report["summary"]:
+            report["summary"][key] += len(section[key])
+    return reports
+
+def _upsert_statement(dialect_name: str):
+    """病棟・勤務帯の一意制約で競合した場合に更新するINSERTを返す（対応していないDBではNone）"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    table = HandoverReport.__table__
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.ward, table.c.shift_start],
+        set_={"generated_at": statement.excluded.generated_at, "content": statement.excluded.content},
+        # 同時に生成された場合は、より新しいデータから生成したレポートを残す
+        where=table.c.generated_at <= statement.excluded.generated_at,
+    )
+
+def _store_items(db: Session, shift_start: datetime, reports: Dict[str, dict], generated_at: datetime):
+    """レポートに含めた患者と項目の索引を置き換える（終了した勤務帯の索引は削除する）"""
+    items = HandoverReportItem.__table__
+    db.execute(items.delete().where(or_(
+        items.c.shift_start < shift_start_at(generated_at),
+        (items.c.shift_start == shift_start) & items.c.ward.in_(list(reports)),
+    )))
+    rows = []
+    for ward, report in reports.items():
+        for section in report["patients"]:
+            code = section["patient_code"]
+            rows.append({"shift_start": shift_start, "ward": ward, "patient_code": code,
+                         "resource": None, "resource_id": None})
+            for key, resource in (("pending_injections", Injection.__tablename__),
+                                  ("overdue_injections", Injection.__tablename__),
+                                  ("plans_near_target", NursingPlan.__tablename__)):
+                rows.extend({"shift_start": shift_start, "ward": ward, "patient_code": code,
+                             "resource": resource, "resource_id": item["id"]} for item in section[key])
+    if rows:
+        db.execute(insert(items), rows)
+
+def store_reports(db: Session, shift_start: datetime, reports: Dict[str, dict], generated_at: datetime):
+    """レポートを保存する（同じ病棟・勤務帯の既存レポートは置き換える）
+
+    バックグラウンドの生成とリクエスト時の生成が同時に保存しても一意制約違反にならないよう、
+    1文のUPSERTで保存する。
+    """
+    if not reports:
+        return
+    table = HandoverReport.__table__
+    rows = [
+        {
+            "ward": ward,
+            "shift_start": shift_start,
+            "generated_at": generated_at,
+            "content": json.dumps({**report, "generated_at": _iso(generated_at)}, ensure_ascii=False),
+        }
+        for ward, report in reports.items()
+    ]
+    _store_items(db, shift_start, reports, generated_at)
+    statement = _upsert_statement(db.get_bind().dialect.name)
+    if statement is not None:
+        db.execute(statement, rows)
+    else:
+        # UPSERT非対応のDBでは行ごとに挿入し、競合した場合は既存の行を更新する
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**row))
+            except IntegrityError:
+                db.execute(update(table).where(
+                    table.c.ward == row["ward"],
+                    table.c.shift_start == shift_start,
+                    table.c.generated_at <= generated_at,
+                ).values(generated_at=generated_at, content=row["content"]))
+    db.commit()
+
+def generate_and_store(shift_start: datetime, wards: Optional[List[str]] = None) -> List[str]:
+    """レポートを作成して保存し、生成した病棟の一覧を返す（プロセスプールから呼ばれる）"""
+    db = SessionLocal()
+    try:
+        # 変更検知の取りこぼしを防ぐため、問い合わせ前の時刻を生成時刻として記録する
+        generated_at = datetime.now()
+        reports = build_reports(db, shift_start, wards)
+        store_reports(db, shift_start, reports, generated_at)
+        return list(reports)
+    finally:
+        db.close()
+
+def changed_wards(db: Session, since: datetime, shift_start: datetime) -> set:
+    """指定時刻以降に申し送り対象のデータが変更された病棟を返す
+
+    削除された注射実施・看護計画と、転棟・退院した患者は、変更前の病棟が分からないため、
+    その勤務帯のレポートの索引（HandoverReportItem）から病棟を求める。
+    """
+    codes = set()
+    for model in (Injection, NursingPlan):
+        rows = db.query(model.patient_id).filter(
+            or_(model.created_at >= since, model.updated_at >= since)
+        ).distinct().all()
+        codes.update(row.patient_id for row in rows)
+    patient_ids = {row.patient_id for row in
+                   db.query(VitalSign.patient_id).filter(VitalSign.timestamp >= since).distinct().all()}
+    moved = [row.patient_code for row in db.query(Patient.patient_code).filter(
+        or_(Patient.created_at >= since, Patient.updated_at >= since)
+    ).all()]
+    codes.update(moved)
+
+    wards = set()
+    for entry in patient_directory.list(db):
+        if entry.patient_code in codes or entry.id in patient_ids:
+            wards.add(entry.ward)
+
+    conditions = []
+    if moved:
+        conditions.append(HandoverReportItem.patient_code.in_(moved))
+    for resource in (Injection.__tablename__, NursingPlan.__tablename__):
+        deleted = [row.resource_id for row in db.query(SyncTombstone.resource_id).filter(
+            SyncTombstone.resource == resource, SyncTombstone.deleted_at >= since,
+        ).all()]
+        if deleted:
+            conditions.append((HandoverReportItem.resource == resource) & HandoverReportItem.resource_id.in_(deleted))
+    if conditions:
+        rows = db.query(HandoverReportItem.ward).filter(
+            HandoverReportItem.shift_start == shift_start, or_(*conditions),
+        ).distinct().all()
+        wards.update(row.ward for row in rows)
+    return wards
+
+class HandoverScheduler:
+    """申し送りレポートを勤務帯の開始前に生成し、変更があった病棟を再生成する"""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self.watermarks: Dict[datetime, datetime] = {}
+
+    def target_shifts(self, now: datetime) -> List[datetime]:
+        """生成対象の勤務帯（現在の勤務帯と、開始が近づいた次の勤務帯）"""
+        shifts = [shift_start_at(now)]
+        upcoming = next_shift_start(now)
+        if upcoming - now <= timedelta(minutes=LEAD_MINUTES):
+            shifts.append(upcoming)
+        return shifts
+
+    def _watermark(self, db: Session, shift_start: datetime) -> Optional[datetime]:
+        if shift_start not in self.watermarks:
+            generated_at = db.query(func.min(HandoverReport.generated_at)).filter(
+                HandoverReport.shift_start == shift_start).scalar()
+            if generated_at is not None:
+                self.watermarks[shift_start] = generated_at
+        return self.watermarks.get(shift_start)
+
+    def run_once(self, pool: ProcessPoolExecutor, now: Optional[datetime] = None):
+        now = now or datetime.now()
+        shifts = self.target_shifts(now)
+        db = SessionLocal()
+        try:
+            plan: List[Tuple[datetime, Optional[List[str]]]] = []
+            for shift_start in shifts:
+                watermark = self._watermark(db, shift_start)
+                if watermark is None:
+                    plan.append((shift_start, None))
+                else:
+                    wards = changed_wards(db, watermark, shift_start)
+                    if wards:
+                        plan.append((shift_start, sorted(wards)))
+            all_wards = sorted({entry.ward for entry in patient_directory.list(db, active_only=True)})
+        finally:
+            db.close()
+
+        for shift_start, wards in plan:
+            started_at = datetime.now()
+            targets = wards if wards is not None else all_wards
+            # 病棟をプロセス数で分割して並列に生成する
+            chunks = [targets[i::self.pool_size] for i in range(self.pool_size) if targets[i::self.pool_size]]
+            futures = [pool.submit(generate_and_store, shift_start, chunk) for chunk in chunks]
+            for future in futures:
+                future.result()
+            self.watermarks[shift_start] = started_at
+            logger.info("申し送りレポートを生成しました: %s (%d病棟)", shift_start, len(targets))
+
+        # 終了した勤務帯の変更検知は不要
+        for shift_start in list(self.watermarks):
+            if shift_start not in shifts:
+                del self.watermarks[shift_start]
+
+@register_background_task
+def handover_report_scheduler(stop_event: threading.Event):
+    """申し送りレポートの定期生成タスク（リーダーワーカーでのみ実行される）"""
+    scheduler = HandoverScheduler()
+    # スレッドを持つワーカープロセスからのforkを避け、spawnで子プロセスを起動する
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=POOL_SIZE, mp_context=context) as pool:
+        while not stop_event.is_set():
+            try:
+                scheduler.run_once(pool)
+            except Exception:
+                logger.exception("申し送りレポートの生成に失敗しました")
+            stop_event.wait(POLL_SECONDS)
+
+class HandoverReportCache:
+    """保存済みレポートのワーカー内キャッシュ
+
+    生成時刻だけをDBで確認し、変わっていなければエンコード済みの内容を返す。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, datetime], Tuple[datetime, bytes]] = {}
+
+    def get(self, db: Session, ward: str, shift_start: datetime) -> Optional[bytes]:
+        key = (ward, shift_start)
+        generated_at = db.query(HandoverReport.generated_at).filter(
+            HandoverReport.ward == ward, HandoverReport.shift_start == shift_start).scalar()
+        if generated_at is None:
+            return None
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and cached[0] == generated_at:
+            return cached[1]
+
+        content = db.query(HandoverReport.content).filter(
+            HandoverReport.ward == ward, HandoverReport.shift_start == shift_start).scalar()
+        if content is None:
+            return None
+        encoded = content.encode("utf-8")
+        with self._lock:
+            # 終了した勤務帯のレポートはキャッシュから外す
+            for stale in [k for k in self._entries if k[1] < previous_shift_start(shift_start)]:
+                del self._entries[stale]
+            self._entries[key] = (generated_at, encoded)
+        return encoded
+
+# ワーカープロセス内で共有するレポートキャッシュ
+handover_cache = HandoverReportCache()
@@ -0,0 +1,161 @@
+# このファイルは同時実行数の制御とユーザーごとのレート制限を行うミドルウェアを定義します
+
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+from app.dependencies import get_token_subject
+
+# 全体の同時処理数の上限
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+# 参照系リクエストが使用できる同時処理枠の割合（残りは更新系リクエスト用に確保する）
+READ_SHARE = float(os.getenv("ADMISSION_READ_SHARE", "0.8"))
+# ユーザーごとの参照系リクエストの許容レート（1秒あたり）とバースト量
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+# ユーザーごとの更新系リクエストの許容レートとバースト量（端末にためた記録の一括送信を考慮して多めにとる）
+WRITE_RATE_LIMIT_RPS = float(os.getenv("WRITE_RATE_LIMIT_RPS", "5"))
+WRITE_RATE_LIMIT_BURST = float(os.getenv("WRITE_RATE_LIMIT_BURST", "50"))
+
+# 更新系として優先するHTTPメソッド
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# 制御の対象外とするパス
+EXEMPT_PATHS = {"/", "/health"}
+# トークンバケットを整理するしきい値
+MAX_BUCKETS = 10000
+
+class TokenBucket:
+    """トークンバケット"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self) -> bool:
+        """トークンを1つ消費する（不足している場合はFalse）"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        """次のトークンが貯まるまでの秒数"""
+        return max(1, math.ceil((1 - self.tokens) / self.rate))
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class AdmissionStats:
+    """受付制御の統計情報"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.shed_overloaded = 0
+        self.shed_rate_limited = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": self.admitted,
+            "shed_overloaded": self.shed_overloaded,
+            "shed_rate_limited": self.shed_rate_limited,
+            "max_in_flight": MAX_IN_FLIGHT,
+            "read_limit": max(1, int(MAX_IN_FLIGHT * READ_SHARE)),
+        }
+
+# ワーカープロセス内で共有する統計情報
+admission_stats = AdmissionStats()
+
+class AdmissionControlMiddleware:
+    """過負荷時にリクエストを早期に拒否するミドルウェア
+
+    - 同時処理数が上限に達した場合は503を返す
+    - 参照系リクエストは上限の一部（READ_SHARE）までしか使えず、更新系のための枠を残す
+    - 認証ユーザー（未認証の場合は接続元アドレス）ごとに参照系・更新系それぞれのレートを制限し、
+      超過時は429を返す（1台の端末が更新系の枠を使い切って他のユーザーの更新を妨げないようにする）
+    """
+
+    def __init__(self, app, max_in_flight: int = MAX_IN_FLIGHT, read_share: float = READ_SHARE,
+                 rate: float = RATE_LIMIT_RPS, burst: float = RATE_LIMIT_BURST,
+                 write_rate: float = WRITE_RATE_LIMIT_RPS, write_burst: float = WRITE_RATE_LIMIT_BURST):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.read_limit = max(1, int(max_in_flight * read_share))
+        self.limits = {False: (rate, burst), True: (write_rate, write_burst)}
+        self.buckets = {}
+        self.stats = admission_stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] in WRITE_METHODS
+        limit = self.max_in_flight if is_write else self.read_limit
+        if self.stats.in_flight >= limit:
+            self.stats.shed_overloaded += 1
+            await self._reject(scope, receive, send, 503, "サーバーが混雑しています。しばらくしてから再試行してください", 1)
+            return
+
+        bucket = self._bucket_for(scope, is_write)
+        if not bucket.consume():
+            self.stats.shed_rate_limited += 1
+            await self._reject(scope, receive, send, 429, "リクエストが多すぎます", bucket.retry_after())
+            return
+
+        self.stats.admitted += 1
+        self.stats.in_flight += 1
+        self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.stats.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.stats.in_flight -= 1
+
+    def _principal(self, scope) -> str:
+        """リクエストの主体（認証ユーザー名または接続元アドレス）を取得する"""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    subject = get_token_subject(token)
+                    if subject:
+                        return f"user:{subject}"
+                break
+        client = scope.get("client")
+        return f"addr:{client[0]}" if client else "addr:unknown"
+
+    def _bucket_for(self, scope, is_write: bool) -> TokenBucket:
+        key = (self._principal(scope), is_write)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= MAX_BUCKETS:
+                self._prune()
+            bucket = self.buckets[key] = TokenBucket(*self.limits[is_write])
+        return bucket
+
+    def _prune(self):
+        """満タンのバケット（しばらくアクセスのない主体）を破棄する"""
+        now = time.monotonic()
+        for key in [key for key, bucket in self.buckets.items() if bucket.is_full(now)]:
+            del self.buckets[key]
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, retry_after: int):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
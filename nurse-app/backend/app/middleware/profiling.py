@@ -0,0 +1,286 @@
+# このファイルはリクエスト単位のプロファイリングを行うミドルウェアを定義します
+
+import collections
+import contextvars
+import glob
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app.coordination import LOCK_DIR, process_lock
+from app.database import SessionLocal, engine
+from app.dependencies import get_token_subject
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# ランダムにプロファイリングするリクエストの割合（0で無効）
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# 保持するプロファイルの件数（全ワーカーの合計）
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "20"))
+# プロファイルの保存先（どのワーカーからも取得できるよう、同一ホスト上のワーカー間で共有する）
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(LOCK_DIR, "nurse_app_profiles"))
+# スタックを採取する間隔（秒）
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+
+# 管理者がプロファイリングを要求するヘッダー
+PROFILE_HEADER = b"x-profile"
+# 1リクエストで記録するSQLの上限
+MAX_STATEMENTS = 500
+# 記録するスタックの深さの上限
+MAX_STACK_DEPTH = 64
+
+# 処理中のリクエストのプロファイル（スレッドプールで実行される処理にも引き継がれる）
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+class RequestProfile:
+    """1リクエスト分のプロファイル（スタックの採取結果とSQLの実行時間）"""
+
+    def __init__(self, method: str, path: str, trigger: str, user: Optional[str]):
+        self.id = None
+        self.method = method
+        self.path = path
+        self.trigger = trigger  # 'header' または 'sampled'
+        self.user = user
+        self.started_at = datetime.now()
+        self.status_code = None
+        self.duration_ms = None
+        self.statements = []
+        self.statements_dropped = 0
+        self.stacks = collections.Counter()
+        self.sample_count = 0
+        # スタックを採取するスレッド（イベントループと、SQLを実行したスレッドプールのスレッド）
+        self.threads = {threading.get_ident()}
+
+    def record_statement(self, statement: str, duration: float, executemany: bool):
+        self.threads.add(threading.get_ident())
+        if len(self.statements) >= MAX_STATEMENTS:
+            self.statements_dropped += 1
+            return
+        # 患者情報を含みうるため、パラメーターは記録しない
+        self.statements.append({
+            "statement": statement,
+            "duration_ms": round(duration * 1000, 3),
+            "executemany": executemany,
+        })
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "user": self.user,
+            "started_at": self.started_at.isoformat(),
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "sql_count": len(self.statements) + self.statements_dropped,
+            "sql_ms": round(sum(s["duration_ms"] for s in self.statements), 3),
+            "sample_count": self.sample_count,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "sample_interval_ms": PROFILE_SAMPLE_INTERVAL * 1000,
+            "statements": self.statements,
+            "statements_dropped": self.statements_dropped,
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common()],
+        }
+
+def folded_stacks(profile: dict) -> str:
+    """保存したプロファイルのスタックをフレームグラフ用の折りたたみ形式（1行に「フレーム;フレーム;... 回数」）で返す"""
+    return "".join(f"{item['stack']} {item['samples']}\n" for item in profile["stacks"])
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class StackSampler:
+    """プロファイル対象のスレッドのスタックを一定間隔で採取する
+
+    同期処理のエンドポイントはスレッドプールで実行されるため、呼び出したスレッドしか計測できない
+    cProfileではなく、対象スレッドのスタックを外側から採取する方式をとる。
+    イベントループのスレッドには並行して処理中の他のリクエストも現れる点に注意する。
+    """
+
+    def __init__(self, profile: RequestProfile, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.profile = profile
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        profile = self.profile
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(profile.threads):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    profile.stacks[";".join(reversed(stack))] += 1
+                    profile.sample_count += 1
+
+class ProfileStore:
+    """直近のプロファイルをワーカー間で共有するディレクトリに保存する
+
+    X-Profile-Idを返したワーカーとは別のワーカーに取得のリクエストが振り分けられても
+    取得できるよう、終了したプロファイルはJSONファイルとして保存し、全ワーカーの合計で
+    size件を超えた古いものから削除する。IDにはワーカーのプロセスIDを含め、ワーカー間で重複させない。
+    """
+
+    # 一覧に含めない詳細の項目
+    DETAIL_FIELDS = ("sample_interval_ms", "statements", "statements_dropped", "stacks")
+
+    def __init__(self, directory: str = PROFILE_DIR, size: int = PROFILE_RING_SIZE):
+        self.directory = directory
+        self.size = size
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def new_id(self) -> str:
+        with self.lock:
+            return f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}-{next(self.ids)}"
+
+    def _path(self, profile_id: str) -> Optional[str]:
+        # IDをファイル名に使うため、採番した形式以外（パスの区切りなど）は受け付けない
+        if not profile_id or not all(part.isdigit() for part in profile_id.split("-")):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile: RequestProfile):
+        """終了したプロファイルを保存する"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile.id)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False)
+        os.replace(temporary, path)
+        with process_lock("profiles"):
+            saved = sorted(
+                glob.glob(os.path.join(self.directory, "*.json")),
+                key=lambda saved_path: (os.stat(saved_path).st_mtime_ns, os.path.basename(saved_path)),
+            )
+            for stale in saved[:max(0, len(saved) - self.size)]:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        path = self._path(profile_id)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def summaries(self) -> list:
+        profiles = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            profile = self.get(os.path.basename(path)[:-len(".json")])
+            if profile is not None:
+                profiles.append({key: value for key, value in profile.items() if key not in self.DETAIL_FIELDS})
+        return sorted(profiles, key=lambda profile: profile["started_at"], reverse=True)
+
+# ワーカー間で共有するプロファイルの保存先
+profile_store = ProfileStore()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None and conn.info.get("profile_started"):
+        started = conn.info["profile_started"].pop()
+        profile.record_statement(statement, time.perf_counter() - started, executemany)
+
+def _is_admin(username: str) -> bool:
+    db = SessionLocal()
+    try:
+        return bool(db.query(User.is_admin).filter(User.username == username).scalar())
+    finally:
+        db.close()
+
+class ProfilingMiddleware:
+    """指定されたリクエストのプロファイルを採取するミドルウェア
+
+    - 管理者がX-Profileヘッダーを付けたリクエスト、またはPROFILE_SAMPLE_RATEの割合で
+      ランダムに選んだリクエストが対象
+    - 採取したプロファイルのIDはX-Profile-Idヘッダーで返し、管理者用エンドポイントから取得できる
+    """
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, store: ProfileStore = profile_store):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger, user = await self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger, user)
+        profile.id = self.store.new_id()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with StackSampler(profile):
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current_profile.reset(token)
+            try:
+                await run_in_threadpool(self.store.save, profile)
+            except OSError:
+                logger.warning("プロファイル %s を保存できませんでした", profile.id, exc_info=True)
+
+    async def _trigger(self, scope):
+        """プロファイリングの要否と理由、要求したユーザーを判定する"""
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers:
+            scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+            subject = get_token_subject(token) if scheme.lower() == "bearer" and token else None
+            if subject and await run_in_threadpool(_is_admin, subject):
+                return "header", subject
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled", None
+        return None, None
@@ -0,0 +1,12 @@
+# このファイルはすべてのモデルを読み込み、テーブル定義とリレーションシップを登録します
+
+from app.models.user import User
+from app.models.patient import Patient
+from app.models.injection import Injection
+from app.models.nursing_plan import NursingPlan
+from app.models.vital_signs import VitalSign
+from app.models.import_job import ImportJob
+from app.models.handover_report import HandoverReport, HandoverReportItem
+from app.models.sync import SyncCounter, SyncTombstone
+from app.models.nursing_record import NursingRecordPartition
+from app.models.early_warning import EarlyWarningScore
@@ -0,0 +1,18 @@
+# このファイルは早期警告スコアモデルを定義します
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+
+from app.database import Base
+
+class EarlyWarningScore(Base):
+    """早期警告スコアの変化の履歴（スコアまたはリスク区分が変わったときだけ記録する）"""
+    __tablename__ = "early_warning_scores"
+    __table_args__ = (Index("ix_early_warning_scores_patient_calculated", "patient_id", "calculated_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"))
+    score = Column(Integer)
+    risk = Column(String)  # 'low', 'low_medium', 'medium', 'high'
+    components = Column(Text)  # 項目ごとの点数（JSON）
+    vital_sign_id = Column(Integer, nullable=True)  # スコアが変わる原因となった測定値
+    calculated_at = Column(DateTime)
@@ -0,0 +1,35 @@
+# このファイルは申し送りレポートモデルを定義します
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, UniqueConstraint
+
+from app.database import Base
+
+class HandoverReport(Base):
+    """申し送りレポートモデル（病棟・勤務帯ごとに事前生成した内容を保存する）"""
+    __tablename__ = "handover_reports"
+    __table_args__ = (UniqueConstraint("ward", "shift_start", name="uq_handover_reports_ward_shift"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    ward = Column(String, index=True)
+    shift_start = Column(DateTime, index=True)
+    generated_at = Column(DateTime)
+    content = Column(Text)  # レンダリング済みのJSON
+
+class HandoverReportItem(Base):
+    """申し送りレポートに含めた患者と項目の索引
+
+    削除された注射実施・看護計画や転棟・退院した患者は変更前の病棟が分からないため、
+    再生成が必要な病棟をこの索引から求める。resource が NULL の行は患者自体を表す。
+    """
+    __tablename__ = "handover_report_items"
+    __table_args__ = (
+        Index("ix_handover_report_items_shift_patient", "shift_start", "patient_code"),
+        Index("ix_handover_report_items_shift_resource", "shift_start", "resource", "resource_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    shift_start = Column(DateTime)
+    ward = Column(String)
+    patient_code = Column(String)
+    resource = Column(String, nullable=True)  # 'injections' または 'nursing_plans'
+    resource_id = Column(Integer, nullable=True)
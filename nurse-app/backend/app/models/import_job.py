@@ -0,0 +1,19 @@
+# このファイルは一括インポートの進捗（チェックポイント）モデルを定義します
+
+from sqlalchemy import Boolean, Column, Integer, String, DateTime
+
+from app.database import Base
+
+class ImportJob(Base):
+    """一括インポートジョブモデル"""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    target = Column(String)  # 'injections', 'nursing-plans'
+    last_record = Column(Integer, default=0)  # 取り込み済みの最終レコード番号
+    inserted_count = Column(Integer, default=0)
+    rejected_count = Column(Integer, default=0)
+    completed = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=True)
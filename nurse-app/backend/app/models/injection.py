@@ -10,7 +10,7 @@ class Injection(Base):
     __tablename__ = "injections"
 
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(String, index=True)
+    patient_id = Column(String, ForeignKey("patients.patient_code"), index=True)
     patient_name = Column(String)
     medication = Column(String)
     dose = Column(String)
@@ -21,6 +21,9 @@ class Injection(Base):
     status = Column(String)  # 'scheduled', 'administered', 'cancelled'
     notes = Column(Text, nullable=True)
     
+    version = Column(Integer, nullable=False, default=1)  # 楽観的排他制御用のバージョン
+    change_seq = Column(Integer, index=True)  # 差分同期用の変更連番
+    
     # 作成者と更新者
     created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime)
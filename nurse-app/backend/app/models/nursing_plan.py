@@ -9,6 +9,7 @@ from app.database import Base
 class JsonList(TypeDecorator):
     """リストをJSON文字列として保存するカスタム型"""
     impl = Text
+    cache_ok = True  # 状態を持たないため、SQLのコンパイル結果をキャッシュしてよい
     
     def process_bind_param(self, value, dialect):
         if value is None:
@@ -25,7 +26,7 @@ class NursingPlan(Base):
     __tablename__ = "nursing_plans"
 
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(String, index=True)
+    patient_id = Column(String, ForeignKey("patients.patient_code"), index=True)
     patient_name = Column(String)
     problem = Column(Text)
     goal = Column(Text)
@@ -35,6 +36,9 @@ class NursingPlan(Base):
     status = Column(String)  # 'active', 'completed', 'cancelled'
     evaluation_notes = Column(Text, nullable=True)
     
+    version = Column(Integer, nullable=False, default=1)  # 楽観的排他制御用のバージョン
+    change_seq = Column(Integer, index=True)  # 差分同期用の変更連番
+    
     # 作成者と更新者
     created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,45 @@
+# このファイルは看護記録モデルを定義します
+#
+# 看護記録は件数が最も多く、ほぼ追記のみのデータのため、記録日時の期間（月、圧縮後は年）ごとに
+# 別テーブル（パーティション）へ保存します。パーティションのテーブルは create_all の対象となる
+# Base.metadata ではなく partition_metadata に登録し、最初の記録が追加される時点で作成します。
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, MetaData, Table
+
+from app.database import Base
+
+# パーティションのテーブル定義の登録先
+partition_metadata = MetaData()
+
+class NursingRecordPartition(Base):
+    """看護記録のパーティション一覧"""
+    __tablename__ = "nursing_record_partitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String, unique=True)
+    period_start = Column(DateTime, index=True)  # この日時以降の記録を保存する
+    period_end = Column(DateTime)  # この日時より前の記録を保存する
+    created_at = Column(DateTime)
+    compacted_at = Column(DateTime, nullable=True)  # 月別パーティションを年別にまとめた日時
+
+def nursing_record_table(table_name: str) -> Table:
+    """パーティションのテーブル定義を返す
+
+    追記の負荷を抑えるため、索引は時系列の読み出しに使う患者・記録日時の複合索引だけとする。
+    外部キーはパーティションごとに張らず、患者の存在は追加時にアプリケーションで確認する。
+    IDは全パーティションで一意な値を採番して指定する。
+    """
+    if table_name in partition_metadata.tables:
+        return partition_metadata.tables[table_name]
+    return Table(
+        table_name,
+        partition_metadata,
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("patient_id", String, nullable=False),  # 患者コード
+        Column("recorded_at", DateTime, nullable=False),
+        Column("record_type", String),
+        Column("content", Text),
+        Column("created_by_id", Integer),
+        Column("created_at", DateTime),
+        Index(f"ix_{table_name}_patient_recorded", "patient_id", "recorded_at", "id"),
+    )
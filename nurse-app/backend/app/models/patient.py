@@ -0,0 +1,26 @@
+# このファイルはpatientモデルを定義します
+
+from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.database import Base
+
+class Patient(Base):
+    """患者モデル"""
+    __tablename__ = "patients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_code = Column(String, unique=True, index=True)  # 'P001' など。注射実施・看護計画のpatient_idが参照する
+    name = Column(String)
+    name_kana = Column(String)
+    ward = Column(String, index=True)
+    bed = Column(String, nullable=True)
+    is_active = Column(Boolean, default=True)  # 入院中かどうか
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True)
+
+    # リレーションシップ
+    # 患者の削除時にORMがバイタルサインの患者IDをNULLにしないようにする（記録が残る患者は削除させない）
+    vital_signs = relationship("VitalSign", back_populates="patient", passive_deletes="all")
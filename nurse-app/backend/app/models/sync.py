@@ -0,0 +1,23 @@
+# このファイルは差分同期用のモデルを定義します
+
+from sqlalchemy import Column, Integer, String, DateTime, Index
+
+from app.database import Base
+
+class SyncCounter(Base):
+    """変更連番のカウンター（リソースごとに1行）"""
+    __tablename__ = "sync_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class SyncTombstone(Base):
+    """削除されたレコードの記録（差分同期で削除を伝えるために使う）"""
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (Index("ix_sync_tombstones_resource_seq", "resource", "change_seq"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource = Column(String)  # テーブル名
+    resource_id = Column(Integer)
+    change_seq = Column(Integer)
+    deleted_at = Column(DateTime)
@@ -18,7 +18,5 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
 
     # リレーションシップ
-    injections = relationship("Injection", back_populates="created_by_user")
-    treatments = relationship("Treatment", back_populates="created_by_user")
-    nursing_plans = relationship("NursingPlan", back_populates="created_by_user")
-    nursing_records = relationship("NursingRecord", back_populates="created_by_user")
\ No newline at end of file
+    injections = relationship("Injection", foreign_keys="Injection.created_by_id", back_populates="created_by_user")
+    nursing_plans = relationship("NursingPlan", foreign_keys="NursingPlan.created_by_id", back_populates="created_by_user")
\ No newline at end of file
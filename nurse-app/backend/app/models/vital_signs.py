@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, String, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, Float, DateTime, String, ForeignKey
 from sqlalchemy.orm import relationship
 from app.database import Base
 import datetime
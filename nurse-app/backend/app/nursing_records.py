@@ -0,0 +1,328 @@
+# このファイルは看護記録の保存・読み出しとパーティションの保守を定義します
+#
+# - 記録は記録日時の月ごとのパーティション（nursing_records_YYYYMM）に追記する
+# - IDは全パーティションで一意な値をワーカーごとにまとめて採番し、追加はINSERT 1文で行う（再読み込みなし）
+# - 患者の時系列は（記録日時, ID）のカーソルで新しい順に読み出し、新しいパーティションから順に問い合わせる
+# - 保守タスクは古い月別パーティションを年別（nursing_records_YYYY）にまとめ、保持期間を過ぎた
+#   パーティションをテーブルごと削除する（大量のDELETEを発生させない）
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from app.coordination import process_lock, register_background_task
+from app.database import SessionLocal, engine
+from app.models.nursing_record import NursingRecordPartition, nursing_record_table
+from app.sync import next_change_seq
+
+logger = logging.getLogger(__name__)
+
+# 保持期間（月）。これより古いパーティションは削除する（0の場合は削除しない）
+RETENTION_MONTHS = int(os.getenv("NURSING_RECORD_RETENTION_MONTHS", "0"))
+# 何か月より古い月別パーティションを年別にまとめるか（0の場合はまとめない）
+COMPACT_AFTER_MONTHS = int(os.getenv("NURSING_RECORD_COMPACT_AFTER_MONTHS", "12"))
+# ワーカーごとにまとめて採番するIDの数
+ID_BLOCK_SIZE = int(os.getenv("NURSING_RECORD_ID_BLOCK", "100"))
+# 時系列の1ページの最大件数
+MAX_PAGE_SIZE = 200
+
+# パーティションの作成・削除を直列化するロックの名前
+PARTITION_LOCK = "nursing_record_partitions"
+
+# テーブルが削除・統合された直後のパーティション一覧で問い合わせた場合のエラー
+_MISSING_TABLE_ERRORS = (OperationalError, ProgrammingError)
+
+def month_start(at: datetime) -> datetime:
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(at: datetime, months: int) -> datetime:
+    index = at.year * 12 + at.month - 1 + months
+    return at.replace(year=index // 12, month=index % 12 + 1)
+
+def encode_cursor(recorded_at: datetime, record_id: int) -> str:
+    return f"{recorded_at.isoformat()},{record_id}"
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """カーソルを（記録日時, ID）に戻す（不正な場合はValueError）"""
+    recorded_at, _, record_id = cursor.rpartition(",")
+    return datetime.fromisoformat(recorded_at), int(record_id)
+
+class Partition:
+    def __init__(self, table_name: str, period_start: datetime, period_end: datetime):
+        self.table_name = table_name
+        self.period_start = period_start
+        self.period_end = period_end
+
+    @property
+    def table(self):
+        return nursing_record_table(self.table_name)
+
+    def covers(self, at: datetime) -> bool:
+        return self.period_start <= at < self.period_end
+
+class PartitionCatalog:
+    """パーティション一覧（追記先の決定に使うため、ワーカープロセス内にキャッシュする）"""
+
+    def __init__(self):
+        self.partitions: List[Partition] = []
+        self.lock = threading.Lock()
+
+    def load(self, db: Session) -> List[Partition]:
+        """最新のパーティション一覧を読み込む（新しい順）"""
+        rows = db.query(
+            NursingRecordPartition.table_name,
+            NursingRecordPartition.period_start,
+            NursingRecordPartition.period_end,
+        ).order_by(NursingRecordPartition.period_start.desc()).all()
+        partitions = [Partition(*row) for row in rows]
+        with self.lock:
+            self.partitions = partitions
+        return partitions
+
+    def find(self, at: datetime) -> Optional[Partition]:
+        with self.lock:
+            return next((partition for partition in self.partitions if partition.covers(at)), None)
+
+    def for_append(self, db: Session, at: datetime) -> Partition:
+        """記録日時の追記先のパーティションを返す（なければ月別パーティションを作成する）"""
+        partition = self.find(at)
+        if partition is None:
+            self.load(db)
+            partition = self.find(at)
+        if partition is None:
+            create_partition(at)
+            self.load(db)
+            partition = self.find(at)
+        return partition
+
+partition_catalog = PartitionCatalog()
+
+def create_partition(at: datetime):
+    """記録日時を含む月のパーティションを作成する（他のワーカーが作成済みの場合は何もしない）"""
+    period_start = month_start(at)
+    table_name = f"nursing_records_{period_start:%Y%m}"
+    registry = NursingRecordPartition.__table__
+    with process_lock(PARTITION_LOCK), engine.begin() as conn:
+        exists = conn.execute(
+            select(registry.c.id).where(registry.c.period_start <= at, registry.c.period_end > at)
+        ).first()
+        if exists:
+            return
+        nursing_record_table(table_name).create(conn, checkfirst=True)
+        conn.execute(insert(registry).values(
+            table_name=table_name,
+            period_start=period_start,
+            period_end=add_months(period_start, 1),
+            created_at=datetime.now(),
+        ))
+    logger.info("看護記録のパーティション %s を作成しました", table_name)
+
+class IdAllocator:
+    """全パーティションで一意なIDをまとめて採番する
+
+    追記のたびにカウンターの行をロックしないよう、ワーカーごとにblock_size件ずつ予約する。
+    そのためIDの大小は記録の順序と一致しない（順序は記録日時とIDの組で決まる）。
+    """
+
+    def __init__(self, name: str, block_size: int = ID_BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self.next_id = 0
+        self.end_id = 0
+        self.lock = threading.Lock()
+
+    def allocate(self, count: int) -> List[int]:
+        ids = []
+        with self.lock:
+            while len(ids) < count:
+                if self.next_id >= self.end_id:
+                    self._reserve(max(self.block_size, count - len(ids)))
+                take = min(count - len(ids), self.end_id - self.next_id)
+                ids.extend(range(self.next_id, self.next_id + take))
+                self.next_id += take
+        return ids
+
+    def _reserve(self, size: int):
+        # リクエストのトランザクションとは別に確定させ、カウンターの行のロックをすぐに解放する
+        db = SessionLocal()
+        try:
+            self.next_id = next_change_seq(db, self.name, size)
+            db.commit()
+        finally:
+            db.close()
+        self.end_id = self.next_id + size
+
+id_allocator = IdAllocator("nursing_records")
+
+def append_records(db: Session, records: List[dict], user_id: int) -> List[dict]:
+    """看護記録を追記し、追加した行を返す（コミットは呼び出し側で行う）
+
+    パーティションごとにINSERT（複数件の場合はexecutemany）を1文ずつ実行する。
+    """
+    now = datetime.now()
+    rows = [
+        {
+            "id": record_id,
+            "patient_id": record["patient_id"],
+            "recorded_at": record.get("recorded_at") or now,
+            "record_type": record["record_type"],
+            "content": record["content"],
+            "created_by_id": user_id,
+            "created_at": now,
+        }
+        for record_id, record in zip(id_allocator.allocate(len(records)), records)
+    ]
+    for attempt in range(2):
+        groups = {}
+        for row in rows:
+            partition = partition_catalog.for_append(db, row["recorded_at"])
+            groups.setdefault(partition.table_name, (partition.table, []))[1].append(row)
+        try:
+            for table, group in groups.values():
+                db.execute(insert(table), group)
+            return rows
+        except _MISSING_TABLE_ERRORS:
+            # 保守タスクがパーティションを統合・削除した直後は一覧を読み直してやり直す
+            db.rollback()
+            if attempt:
+                raise
+            partition_catalog.load(db)
+
+def _read_partitions(db: Session, read):
+    """最新のパーティション一覧でreadを実行する（途中でパーティションが統合された場合は1回やり直す）"""
+    for attempt in range(2):
+        try:
+            return read(partition_catalog.load(db))
+        except _MISSING_TABLE_ERRORS:
+            db.rollback()
+            if attempt:
+                raise
+
+def read_timeline(
+    db: Session,
+    patient_id: str,
+    limit: int,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[List[dict], Optional[Tuple[datetime, int]]]:
+    """患者の看護記録を新しい順に返す（次のページがある場合は次のカーソルも返す）
+
+    カーソルより古い期間のパーティションだけを新しい順に問い合わせ、limit件に達した時点で止める。
+    各パーティションでは患者・記録日時の複合索引を範囲検索する。
+    """
+    upper = cursor[0] if cursor else until
+    # 次のページの有無を判定するため1件多く読む
+    fetch = limit + 1
+
+    def read(partitions: Iterable[Partition]):
+        rows = []
+        for partition in partitions:
+            if upper is not None and partition.period_start > upper:
+                continue
+            if since is not None and partition.period_end <= since:
+                break
+            table = partition.table
+            statement = select(*table.c).where(table.c.patient_id == patient_id)
+            if cursor:
+                statement = statement.where(or_(
+                    table.c.recorded_at < cursor[0],
+                    and_(table.c.recorded_at == cursor[0], table.c.id < cursor[1]),
+                ))
+            elif until is not None:
+                statement = statement.where(table.c.recorded_at < until)
+            if since is not None:
+                statement = statement.where(table.c.recorded_at >= since)
+            statement = statement.order_by(table.c.recorded_at.desc(), table.c.id.desc()).limit(fetch - len(rows))
+            rows.extend(dict(row) for row in db.execute(statement).mappings())
+            if len(rows) >= fetch:
+                break
+        return rows
+
+    rows = _read_partitions(db, read)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]["recorded_at"], rows[-1]["id"])
+
+def get_record(db: Session, record_id: int) -> Optional[dict]:
+    """IDで看護記録を取得する（新しいパーティションから順に主キーで探す）"""
+
+    def read(partitions: Iterable[Partition]):
+        for partition in partitions:
+            table = partition.table
+            row = db.execute(select(*table.c).where(table.c.id == record_id)).mappings().first()
+            if row is not None:
+                return dict(row)
+        return None
+
+    return _read_partitions(db, read)
+
+def maintain_partitions(now: datetime):
+    """古い月別パーティションを年別にまとめ、保持期間を過ぎたパーティションを削除する"""
+    registry = NursingRecordPartition.__table__
+    with process_lock(PARTITION_LOCK), engine.begin() as conn:
+        partitions = [
+            Partition(row.table_name, row.period_start, row.period_end)
+            for row in conn.execute(select(registry).order_by(registry.c.period_start))
+        ]
+
+        if RETENTION_MONTHS > 0:
+            cutoff = add_months(month_start(now), -RETENTION_MONTHS)
+            for partition in [partition for partition in partitions if partition.period_end <= cutoff]:
+                partition.table.drop(conn, checkfirst=True)
+                conn.execute(registry.delete().where(registry.c.table_name == partition.table_name))
+                partitions.remove(partition)
+                logger.info("保持期間を過ぎた看護記録のパーティション %s を削除しました", partition.table_name)
+
+        if COMPACT_AFTER_MONTHS > 0:
+            compact_before = add_months(month_start(now), -COMPACT_AFTER_MONTHS)
+            years = sorted({
+                partition.period_start.year for partition in partitions
+                if add_months(partition.period_start, 1) == partition.period_end
+                and datetime(partition.period_start.year + 1, 1, 1) <= compact_before
+            })
+            for year in years:
+                _compact_year(conn, registry, year, [
+                    partition for partition in partitions if partition.period_start.year == year
+                ], now)
+
+def _compact_year(conn, registry, year: int, partitions: List[Partition], now: datetime):
+    """1年分の月別パーティションを年別パーティションにまとめる"""
+    yearly = next((partition for partition in partitions if partition.period_start == datetime(year, 1, 1)
+                   and partition.period_end == datetime(year + 1, 1, 1)), None)
+    if yearly is None:
+        yearly = Partition(f"nursing_records_{year}", datetime(year, 1, 1), datetime(year + 1, 1, 1))
+        yearly.table.create(conn, checkfirst=True)
+        conn.execute(insert(registry).values(
+            table_name=yearly.table_name,
+            period_start=yearly.period_start,
+            period_end=yearly.period_end,
+            created_at=now,
+            compacted_at=now,
+        ))
+    for partition in partitions:
+        if partition is yearly:
+            continue
+        source = partition.table
+        conn.execute(insert(yearly.table).from_select([column.name for column in source.c], select(source)))
+        source.drop(conn, checkfirst=True)
+        conn.execute(registry.delete().where(registry.c.table_name == partition.table_name))
+    conn.execute(registry.update().where(registry.c.table_name == yearly.table_name).values(compacted_at=now))
+    logger.info("%d年の看護記録を %s にまとめました", year, yearly.table_name)
+
+@register_background_task
+def nursing_record_maintenance(stop_event: threading.Event):
+    """看護記録のパーティションの定期保守タスク（リーダーワーカーでのみ実行される）"""
+    while not stop_event.is_set():
+        try:
+            maintain_partitions(datetime.now())
+        except Exception:
+            logger.exception("看護記録のパーティションの保守に失敗しました")
+        stop_event.wait(3600)
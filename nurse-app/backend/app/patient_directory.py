@@ -0,0 +1,142 @@
+# このファイルは患者名簿のメモリキャッシュを定義します
+
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.patient import Patient
+
+# 他ワーカーでの変更を確認する間隔（秒）
+REVALIDATE_INTERVAL = float(os.getenv("PATIENT_DIRECTORY_REVALIDATE_SECONDS", "5"))
+
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+def normalize_name(value: Optional[str]) -> str:
+    """検索用に文字列を正規化する（全角半角の統一、カタカナをひらがなに、空白除去）"""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKC", value).translate(_KATAKANA_TO_HIRAGANA)
+    return "".join(value.split()).lower()
+
+class PatientEntry:
+    """キャッシュ上の患者情報"""
+    __slots__ = ("id", "patient_code", "name", "name_kana", "ward", "bed", "is_active")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.patient_code = row.patient_code
+        self.name = row.name
+        self.name_kana = row.name_kana
+        self.ward = row.ward
+        self.bed = row.bed
+        self.is_active = row.is_active
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class PatientDirectory:
+    """患者名簿のキャッシュ
+
+    患者テーブル全体をメモリに保持し、病棟での絞り込みと氏名・カナの前方一致検索を
+    DBに問い合わせずに処理する。同一ワーカー内の変更は invalidate() で即時に反映し、
+    他ワーカーでの変更は件数と最終更新日時を定期的に確認して検知する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valid = False
+        self._signature = None
+        self._checked_at = 0.0
+        self._by_code: Dict[str, PatientEntry] = {}
+        self._by_ward: Dict[str, List[PatientEntry]] = {}
+        self._name_index: List[tuple] = []
+        self._kana_index: List[tuple] = []
+
+    def invalidate(self):
+        """キャッシュを無効化する（次回アクセス時に再読み込みする）"""
+        with self._lock:
+            self._valid = False
+
+    def _current_signature(self, db: Session):
+        return db.query(func.count(Patient.id), func.max(Patient.updated_at), func.max(Patient.id)).one()
+
+    def _ensure_loaded(self, db: Session):
+        now = time.monotonic()
+        with self._lock:
+            if self._valid and now - self._checked_at < REVALIDATE_INTERVAL:
+                return
+            signature = tuple(self._current_signature(db))
+            self._checked_at = now
+            if self._valid and signature == self._signature:
+                return
+
+            rows = db.query(
+                Patient.id, Patient.patient_code, Patient.name, Patient.name_kana,
+                Patient.ward, Patient.bed, Patient.is_active
+            ).all()
+            by_code, by_ward, name_index, kana_index = {}, {}, [], []
+            for row in rows:
+                entry = PatientEntry(row)
+                by_code[entry.patient_code] = entry
+                by_ward.setdefault(entry.ward, []).append(entry)
+                name_index.append((normalize_name(entry.name), entry.patient_code))
+                kana_index.append((normalize_name(entry.name_kana), entry.patient_code))
+            for entries in by_ward.values():
+                entries.sort(key=lambda entry: (entry.bed or "", entry.patient_code))
+            name_index.sort()
+            kana_index.sort()
+
+            self._by_code, self._by_ward = by_code, by_ward
+            self._name_index, self._kana_index = name_index, kana_index
+            self._signature = signature
+            self._valid = True
+
+    def get(self, db: Session, patient_code: str) -> Optional[PatientEntry]:
+        """患者コードから患者を取得する"""
+        self._ensure_loaded(db)
+        return self._by_code.get(patient_code)
+
+    def list(self, db: Session, ward: Optional[str] = None, active_only: bool = False) -> List[PatientEntry]:
+        """患者の一覧を取得する（病棟指定時はベッド順）"""
+        self._ensure_loaded(db)
+        if ward is not None:
+            entries = self._by_ward.get(ward, [])
+        else:
+            entries = sorted(self._by_code.values(), key=lambda entry: entry.patient_code)
+        if active_only:
+            entries = [entry for entry in entries if entry.is_active]
+        return entries
+
+    def ward_patient_codes(self, db: Session, ward: str) -> List[str]:
+        """病棟に所属する患者コードの一覧を取得する"""
+        return [entry.patient_code for entry in self.list(db, ward=ward)]
+
+    def search(self, db: Session, prefix: str, ward: Optional[str] = None, limit: int = 20) -> List[PatientEntry]:
+        """氏名またはカナの前方一致で患者を検索する"""
+        self._ensure_loaded(db)
+        key = normalize_name(prefix)
+        if not key:
+            return []
+        codes = []
+        for index in (self._name_index, self._kana_index):
+            position = bisect_left(index, (key, ""))
+            while position < len(index) and index[position][0].startswith(key):
+                codes.append(index[position][1])
+                position += 1
+        results = []
+        for code in dict.fromkeys(codes):
+            entry = self._by_code[code]
+            if ward is None or entry.ward == ward:
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+# ワーカープロセス内で共有する患者名簿
+patient_directory = PatientDirectory()
@@ -0,0 +1,240 @@
+# このファイルは詳細エンドポイントのレスポンス（エンコード済みJSON）のキャッシュを定義します
+#
+# 同じ患者を複数の端末で表示すると、同じ注射実施・看護計画の詳細が繰り返し取得されます。
+# 問い合わせとスキーマによるシリアライズを省くため、エンコード済みのバイト列を
+# （リソース, ID）をキーに保持し、更新・削除・状態遷移の各エンドポイントで無効化します。
+#
+# バックエンド（RESPONSE_CACHE_BACKEND）:
+#   local  ワーカープロセス内のLRU（デフォルト）。無効化は同じワーカー内にしか届かないため、
+#          複数ワーカーで起動する場合は数秒で期限切れにして古さを抑える（default_local_ttl を参照）
+#   redis  RESPONSE_CACHE_REDIS_URL のRedisを全ワーカーで共有する（redisパッケージが必要）
+#   off    キャッシュしない
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "local").lower()
+# ローカルキャッシュの上限（バイト）
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# ローカルキャッシュの有効期限（秒、0で無期限）。未指定の場合はワーカー数から決める（default_local_ttl）
+LOCAL_TTL = os.getenv("RESPONSE_CACHE_LOCAL_TTL")
+# 共有キャッシュの有効期限（秒）。無効化と読み込みが競合した場合の古いデータの残存期間の上限
+SHARED_TTL = int(os.getenv("RESPONSE_CACHE_SHARED_TTL", "300"))
+REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+def default_local_ttl() -> float:
+    """ローカルキャッシュの有効期限（複数ワーカー時は5秒、単一ワーカー時は無期限）
+
+    ワーカー数は WEB_CONCURRENCY から判断する。serve.py は起動前に確定したワーカー数を設定するが、
+    uvicorn --workers や gunicorn -w で直接起動する場合は WEB_CONCURRENCY か
+    RESPONSE_CACHE_LOCAL_TTL を指定する必要がある。ワーカーの起動後に参照されるよう、初回の使用時に評価する。
+    """
+    if LOCAL_TTL is not None:
+        return float(LOCAL_TTL)
+    return 0.0 if int(os.getenv("WEB_CONCURRENCY", "1")) <= 1 else 5.0
+
+class CacheStats:
+    """レスポンスキャッシュの統計情報"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+class LocalBackend:
+    """ワーカープロセス内のLRU（保持するバイト数の合計で上限を決める）"""
+    name = "local"
+
+    def __init__(self, stats: CacheStats, max_bytes: int = MAX_BYTES, ttl: Optional[float] = None):
+        self.stats = stats
+        self.max_bytes = max_bytes
+        self._ttl = ttl
+        self.entries = OrderedDict()  # キー -> (バイト列, 保存時刻)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is None:
+            self._ttl = default_local_ttl()
+        return self._ttl
+
+    def get(self, key: str):
+        """(値, 保存時に渡すトークン) を返す（ワーカー内のみのため、トークンは使わない）"""
+        ttl = self.ttl
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None
+            if ttl and time.monotonic() - entry[1] > ttl:
+                self._remove(key)
+                return None, None
+            self.entries.move_to_end(key)
+            return entry[0], None
+
+    def set(self, key: str, value: bytes, token=None):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic())
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.stats.evictions += 1
+
+    def delete(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        value, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+    def info(self) -> dict:
+        return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+class RedisBackend:
+    """全ワーカーで共有するRedisのキャッシュ
+
+    キーごとの世代（response-gen:キー）を無効化のたびに進め、読み込み時に取得した世代が
+    変わっていない場合だけ保存する（比較と保存はスクリプトで1回に行う）。別のワーカーでの
+    無効化の後に、それより前に読み込んだ古い内容が保存されることはない。
+    """
+    name = "redis"
+
+    # 世代が読み込み時と同じ場合だけ保存する
+    SET_IF_GENERATION = """
+local current = redis.call('GET', KEYS[2])
+if (current or '') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = SHARED_TTL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.set_if_generation = self.client.register_script(self.SET_IF_GENERATION)
+
+    def get(self, key: str):
+        """(値, 保存時に渡す世代) を返す"""
+        value, generation = self.client.mget(f"response:{key}", f"response-gen:{key}")
+        return value, generation
+
+    def set(self, key: str, value: bytes, token=None):
+        self.set_if_generation(
+            keys=[f"response:{key}", f"response-gen:{key}"],
+            args=[value, token or b"", self.ttl],
+        )
+
+    def delete(self, key: str):
+        pipeline = self.client.pipeline()
+        pipeline.incr(f"response-gen:{key}")
+        # 世代はキャッシュの有効期限より長く残し、読み込みから保存までの間に消えないようにする
+        pipeline.expire(f"response-gen:{key}", self.ttl * 2)
+        pipeline.delete(f"response:{key}")
+        pipeline.execute()
+
+    def info(self) -> dict:
+        return {"ttl": self.ttl}
+
+class ResponseCache:
+    """エンコード済みレスポンスのキャッシュ
+
+    共有バックエンドの障害時はキャッシュなしで処理を続ける（エラー件数のみ記録する）。
+    読み込みの間に無効化が行われた場合は、読み込んだ内容が古い可能性があるため保存しない
+    （ワーカー内はこのクラスの世代で、ワーカー間は共有バックエンドの世代で判定する）。
+    """
+
+    def __init__(self, backend_name: str = BACKEND):
+        self.stats = CacheStats()
+        self.backend = None
+        self._generation = 0  # 無効化のたびに進める
+        if backend_name == "redis":
+            try:
+                self.backend = RedisBackend()
+            except ImportError:
+                logger.warning("redisパッケージがないため、ローカルのレスポンスキャッシュを使用します")
+        if self.backend is None and backend_name != "off":
+            self.backend = LocalBackend(self.stats)
+
+    @staticmethod
+    def key(resource: str, record_id: int) -> str:
+        return f"{resource}:{record_id}"
+
+    def get(self, resource: str, record_id: int):
+        """キャッシュを取得する。見つからない場合は (None, 保存時に渡すトークン) を返す"""
+        if self.backend is None:
+            return None, None
+        generation = self._generation
+        try:
+            value, shared = self.backend.get(self.key(resource, record_id))
+        except Exception:
+            self.stats.errors += 1
+            self.stats.misses += 1
+            # 共有の世代が分からない場合は保存しない
+            return None, None
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value, (generation, shared)
+
+    def set(self, resource: str, record_id: int, value: bytes, token):
+        if self.backend is None or token is None:
+            return
+        generation, shared = token
+        if self._generation != generation:
+            return
+        try:
+            self.backend.set(self.key(resource, record_id), value, shared)
+            self.stats.stores += 1
+        except Exception:
+            self.stats.errors += 1
+
+    def invalidate(self, resource: str, record_id: int):
+        """更新・削除されたレコードのキャッシュを破棄する"""
+        if self.backend is None:
+            return
+        self._generation += 1
+        self.stats.invalidations += 1
+        try:
+            self.backend.delete(self.key(resource, record_id))
+        except Exception:
+            self.stats.errors += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else "off",
+            **self.stats.snapshot(),
+            **(self.backend.info() if self.backend else {}),
+        }
+
+# ワーカープロセス内で共有するレスポンスキャッシュ
+response_cache = ResponseCache()
@@ -0,0 +1,46 @@
+# このファイルは管理者用のルーターを定義します
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.dependencies import get_current_admin_user
+from app.models.user import User
+from app.middleware.admission import admission_stats
+from app.middleware.profiling import folded_stacks, profile_store
+from app.response_cache import response_cache
+
+router = APIRouter()
+
+@router.get("/admission")
+async def read_admission_stats(current_user: User = Depends(get_current_admin_user)):
+    """受付制御の統計情報（拒否件数など）を取得する"""
+    return admission_stats.snapshot()
+
+@router.get("/response-cache")
+async def read_response_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """レスポンスキャッシュの統計情報（ヒット率など、このワーカープロセスの分のみ）を取得する"""
+    return response_cache.snapshot()
+
+@router.get("/profiles")
+async def read_profiles(current_user: User = Depends(get_current_admin_user)):
+    """保持しているプロファイルの一覧を新しい順に取得する（全ワーカーの分）"""
+    return profile_store.summaries()
+
+def _get_profile(profile_id: str) -> dict:
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return profile
+
+@router.get("/profiles/{profile_id}")
+async def read_profile(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """プロファイル（SQLの実行時間とスタックの採取結果）をダウンロードする"""
+    return _get_profile(profile_id)
+
+@router.get("/profiles/{profile_id}/stacks", response_class=PlainTextResponse)
+async def read_profile_stacks(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """スタックの採取結果をフレームグラフ用の折りたたみ形式でダウンロードする"""
+    return PlainTextResponse(
+        folded_stacks(_get_profile(profile_id)),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -2,10 +2,12 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from passlib.context import CryptContext
 
+from app.crud import insert_returning
 from app.database import get_db
 from app.dependencies import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.models.user import User
@@ -59,26 +61,24 @@ async def register_user(
     db: Session = Depends(get_db)
 ):
     """新しいユーザーを登録する"""
-    # ユーザー名とメールアドレスの重複チェック
-    db_user_by_username = db.query(User).filter(User.username == user.username).first()
-    if db_user_by_username:
+    # ユーザー名とメールアドレスの重複チェック（1回の問い合わせで両方を確認する）
+    duplicates = db.query(User.username, User.email).filter(
+        or_(User.username == user.username, User.email == user.email)
+    ).all()
+    if any(duplicate.username == user.username for duplicate in duplicates):
         raise HTTPException(status_code=400, detail="このユーザー名はすでに使用されています")
-    
-    db_user_by_email = db.query(User).filter(User.email == user.email).first()
-    if db_user_by_email:
+    if duplicates:
         raise HTTPException(status_code=400, detail="このメールアドレスはすでに使用されています")
     
     # 新しいユーザーの作成
     hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        hashed_password=hashed_password,
-        is_active=user.is_active,
-        is_admin=user.is_admin
-    )
-    db.add(db_user)
+    row = insert_returning(db, User, {
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name,
+        "hashed_password": hashed_password,
+        "is_active": user.is_active,
+        "is_admin": False,  # 管理者権限は登録APIからは付与しない
+    })
     db.commit()
-    db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return row
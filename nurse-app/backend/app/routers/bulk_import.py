@@ -0,0 +1,78 @@
+# このファイルは一括インポート用のルーターを定義します
+
+import io
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from app.bulk_import import IMPORT_FORMATS, IMPORT_TARGETS, DEFAULT_CHUNK_SIZE, default_job_name, detect_format, run_import
+from app.database import get_db
+from app.dependencies import get_current_admin_user
+from app.models.import_job import ImportJob
+from app.models.user import User
+
+router = APIRouter()
+
+# レスポンスに含める不正レコードの最大件数
+MAX_REPORTED_REJECTS = 100
+
+@router.post("/{target}")
+def import_records(
+    target: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    job_name: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """CSVまたはNDJSONファイルから注射実施・看護計画を一括インポートする"""
+    if target not in IMPORT_TARGETS:
+        raise HTTPException(status_code=404, detail="インポート対象が見つかりません")
+    fmt = format or detect_format(file.filename or "")
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"形式は以下のいずれかである必要があります: {', '.join(IMPORT_FORMATS)}")
+
+    if job_name is None:
+        job_name = default_job_name(target, file.filename or "", file.file)
+
+    rejects = []
+
+    def on_reject(number, raw, error):
+        if len(rejects) < MAX_REPORTED_REJECTS:
+            rejects.append({"record": number, "error": error})
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = run_import(
+            db, stream, target, fmt, current_user.id,
+            job_name=job_name,
+            chunk_size=max(1, chunk_size),
+            on_reject=on_reject,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        stream.detach()
+    return {**result.to_dict(), "rejects": rejects}
+
+@router.get("/jobs/{job_name}")
+def read_import_job(
+    job_name: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """インポートジョブの進捗を取得する"""
+    job = db.query(ImportJob).filter(ImportJob.name == job_name).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="インポートジョブが見つかりません")
+    return {
+        "job_name": job.name,
+        "target": job.target,
+        "last_record": job.last_record,
+        "inserted": job.inserted_count,
+        "rejected": job.rejected_count,
+        "completed": job.completed,
+        "updated_at": job.updated_at,
+    }
@@ -0,0 +1,37 @@
+# このファイルは申し送りレポート用のルーターを定義します
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.database import get_db
+from app.dependencies import get_current_active_user
+from app.handover import generate_and_store, handover_cache, next_shift_start, shift_start_at
+from app.models.user import User
+from app.schemas.common import LocalDateTime
+
+router = APIRouter()
+
+@router.get("/{ward}")
+def read_handover_report(
+    ward: str,
+    shift_start: Optional[LocalDateTime] = None,
+    upcoming: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """病棟の申し送りレポートを取得する（事前生成済みの内容を返す）"""
+    now = datetime.now()
+    if shift_start is None:
+        shift_start = next_shift_start(now) if upcoming else shift_start_at(now)
+    else:
+        shift_start = shift_start_at(shift_start)
+
+    content = handover_cache.get(db, ward, shift_start)
+    if content is None:
+        # 事前生成が間に合っていない場合のみ、この病棟だけをその場で生成する
+        if not generate_and_store(shift_start, [ward]):
+            raise HTTPException(status_code=404, detail="病棟が見つかりません")
+        content = handover_cache.get(db, ward, shift_start)
+    return Response(content=content, media_type="application/json")
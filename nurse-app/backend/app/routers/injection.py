@@ -1,27 +1,47 @@
 # このファイルはinjection用のルーターを定義します
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.dependencies import get_current_active_user
+from app.crud import insert_returning, conditional_update, delete_by_id, current_state
+from app.fieldsets import parse_fields, field_columns, fields_response
+from app.patient_directory import patient_directory
+from app.response_cache import response_cache
+from app.sync import MAX_CHANGES, read_changes
 from app.models.user import User
 from app.models.injection import Injection
-from app.schemas.injection import InjectionCreate, InjectionUpdate, Injection as InjectionSchema, InjectionAdminister, InjectionStatus
+from app.schemas.injection import InjectionCreate, InjectionUpdate, Injection as InjectionSchema, InjectionAdminister, InjectionStatus, InjectionChanges
 
 router = APIRouter()
 
+def _check_patient(db: Session, patient_code: Optional[str]):
+    if patient_code is not None and patient_directory.get(db, patient_code) is None:
+        raise HTTPException(status_code=400, detail=f"患者 {patient_code} が見つかりません")
+
 @router.get("/", response_model=List[InjectionSchema])
 async def read_injections(
     skip: int = 0,
     limit: int = 100,
+    ward: Optional[str] = Query(None, description="病棟で絞り込む"),
+    fields: Optional[str] = Query(None, description="取得するフィールド（カンマ区切り）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """注射実施の一覧を取得する"""
-    injections = db.query(Injection).offset(skip).limit(limit).all()
+    filters = []
+    if ward is not None:
+        # 病棟の患者は患者名簿キャッシュから解決し、注射実施テーブルは患者IDの索引で絞り込む
+        filters.append(Injection.patient_id.in_(patient_directory.ward_patient_codes(db, ward)))
+    selected = parse_fields(fields, InjectionSchema)
+    if selected:
+        # 指定されたカラムだけをSELECTし、スキーマを介さずに返す
+        rows = db.query(*field_columns(Injection, selected)).filter(*filters).offset(skip).limit(limit).all()
+        return fields_response(rows)
+    injections = db.query(Injection).filter(*filters).offset(skip).limit(limit).all()
     return injections
 
 @router.post("/", response_model=InjectionSchema, status_code=status.HTTP_201_CREATED)
@@ -31,50 +51,76 @@ async def create_injection(
     current_user: User = Depends(get_current_active_user)
 ):
     """新しい注射実施を作成する"""
-    db_injection = Injection(
+    _check_patient(db, injection.patient_id)
+    row = insert_returning(db, Injection, {
         **injection.dict(),
-        created_by_id=current_user.id,
-        created_at=datetime.now()
-    )
-    db.add(db_injection)
+        "created_by_id": current_user.id,
+        "created_at": datetime.now(),
+    })
     db.commit()
-    db.refresh(db_injection)
-    return db_injection
+    return row
+
+@router.get("/changes", response_model=InjectionChanges)
+async def read_injection_changes(
+    since: int = Query(0, ge=0, description="前回の差分同期で受け取ったカーソル（初回は0）"),
+    limit: int = Query(MAX_CHANGES, ge=1, le=MAX_CHANGES),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """カーソル以降に変更・削除された注射実施を取得する（差分同期）"""
+    result = read_changes(db, Injection, since, limit)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="カーソルが古すぎます。全件を取得し直してください")
+    return result
 
 @router.get("/{injection_id}", response_model=InjectionSchema)
 async def read_injection(
     injection_id: int,
+    fields: Optional[str] = Query(None, description="取得するフィールド（カンマ区切り）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """特定の注射実施を取得する"""
-    db_injection = db.query(Injection).filter(Injection.id == injection_id).first()
-    if db_injection is None:
-        raise HTTPException(status_code=404, detail="注射実施が見つかりません")
-    return db_injection
+    selected = parse_fields(fields, InjectionSchema)
+    if selected:
+        row = db.query(*field_columns(Injection, selected)).filter(Injection.id == injection_id).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="注射実施が見つかりません")
+        return fields_response(row, many=False)
+    # 全フィールドの取得はエンコード済みのレスポンスをキャッシュから返す（更新系のエンドポイントで無効化する）
+    content, generation = response_cache.get("injections", injection_id)
+    if content is None:
+        db_injection = db.query(Injection).filter(Injection.id == injection_id).first()
+        if db_injection is None:
+            raise HTTPException(status_code=404, detail="注射実施が見つかりません")
+        content = InjectionSchema.model_validate(db_injection, from_attributes=True).model_dump_json().encode()
+        response_cache.set("injections", injection_id, content, generation)
+    return Response(content=content, media_type="application/json")
 
 @router.put("/{injection_id}", response_model=InjectionSchema)
 async def update_injection(
     injection_id: int,
     injection: InjectionUpdate,
+    version: Optional[int] = Query(None, description="取得時のバージョン（指定時は他の更新との競合を検出する）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """注射実施を更新する"""
-    db_injection = db.query(Injection).filter(Injection.id == injection_id).first()
-    if db_injection is None:
-        raise HTTPException(status_code=404, detail="注射実施が見つかりません")
-    
     update_data = injection.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_injection, key, value)
-    
-    db_injection.updated_by_id = current_user.id
-    db_injection.updated_at = datetime.now()
-    
+    _check_patient(db, update_data.get("patient_id"))
+    row = conditional_update(
+        db, Injection, injection_id,
+        {**update_data, "updated_by_id": current_user.id, "updated_at": datetime.now()},
+        expected_version=version,
+    )
+    if row is None:
+        db.rollback()
+        if version is not None and current_state(db, Injection, injection_id) is not None:
+            raise HTTPException(status_code=409, detail="注射実施が他のユーザーによって更新されています。最新の情報を取得してください")
+        raise HTTPException(status_code=404, detail="注射実施が見つかりません")
     db.commit()
-    db.refresh(db_injection)
-    return db_injection
+    response_cache.invalidate("injections", injection_id)
+    return row
 
 @router.delete("/{injection_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_injection(
@@ -83,41 +129,47 @@ async def delete_injection(
     current_user: User = Depends(get_current_active_user)
 ):
     """注射実施を削除する"""
-    db_injection = db.query(Injection).filter(Injection.id == injection_id).first()
-    if db_injection is None:
+    if not delete_by_id(db, Injection, injection_id):
         raise HTTPException(status_code=404, detail="注射実施が見つかりません")
-    
-    db.delete(db_injection)
     db.commit()
+    response_cache.invalidate("injections", injection_id)
     return {"detail": "注射実施が削除されました"}
 
 @router.post("/{injection_id}/administer", response_model=InjectionSchema)
 async def administer_injection(
     injection_id: int,
     administration: InjectionAdminister,
+    version: Optional[int] = Query(None, description="取得時のバージョン（指定時は他の更新との競合を検出する）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """注射実施を記録する"""
-    db_injection = db.query(Injection).filter(Injection.id == injection_id).first()
-    if db_injection is None:
-        raise HTTPException(status_code=404, detail="注射実施が見つかりません")
-    
-    if db_injection.status == InjectionStatus.ADMINISTERED:
-        raise HTTPException(status_code=400, detail="この注射はすでに実施済みです")
-    
-    if db_injection.status == InjectionStatus.CANCELLED:
-        raise HTTPException(status_code=400, detail="中止された注射は実施できません")
-    
-    db_injection.administered_time = administration.administered_time
-    db_injection.administered_by = administration.administered_by
-    db_injection.status = InjectionStatus.ADMINISTERED
+    values = {
+        "administered_time": administration.administered_time,
+        "administered_by": administration.administered_by,
+        "status": InjectionStatus.ADMINISTERED.value,
+        "updated_by_id": current_user.id,
+        "updated_at": datetime.now(),
+    }
     if administration.notes:
-        db_injection.notes = administration.notes
-    
-    db_injection.updated_by_id = current_user.id
-    db_injection.updated_at = datetime.now()
-    
+        values["notes"] = administration.notes
+
+    # 状態の確認と更新を1文で行い、同じ注射の二重実施を防ぐ
+    row = conditional_update(
+        db, Injection, injection_id, values,
+        allowed_statuses=[InjectionStatus.SCHEDULED.value],
+        expected_version=version,
+    )
+    if row is None:
+        db.rollback()
+        state = current_state(db, Injection, injection_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="注射実施が見つかりません")
+        if state.status == InjectionStatus.ADMINISTERED:
+            raise HTTPException(status_code=400, detail="この注射はすでに実施済みです")
+        if state.status == InjectionStatus.CANCELLED:
+            raise HTTPException(status_code=400, detail="中止された注射は実施できません")
+        raise HTTPException(status_code=409, detail="注射実施が他のユーザーによって更新されています。最新の情報を取得してください")
     db.commit()
-    db.refresh(db_injection)
-    return db_injection
\ No newline at end of file
+    response_cache.invalidate("injections", injection_id)
+    return row
@@ -1,27 +1,47 @@
 # このファイルはnursing_plan用のルーターを定義します
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.dependencies import get_current_active_user
+from app.crud import insert_returning, conditional_update, delete_by_id, current_state
+from app.fieldsets import parse_fields, field_columns, fields_response
+from app.patient_directory import patient_directory
+from app.response_cache import response_cache
+from app.sync import MAX_CHANGES, read_changes
 from app.models.user import User
 from app.models.nursing_plan import NursingPlan
-from app.schemas.nursing_plan import NursingPlanCreate, NursingPlanUpdate, NursingPlan as NursingPlanSchema, NursingPlanStatus
+from app.schemas.nursing_plan import NursingPlanCreate, NursingPlanUpdate, NursingPlan as NursingPlanSchema, NursingPlanStatus, NursingPlanChanges
 
 router = APIRouter()
 
+def _check_patient(db: Session, patient_code: Optional[str]):
+    if patient_code is not None and patient_directory.get(db, patient_code) is None:
+        raise HTTPException(status_code=400, detail=f"患者 {patient_code} が見つかりません")
+
 @router.get("/", response_model=List[NursingPlanSchema])
 async def read_nursing_plans(
     skip: int = 0,
     limit: int = 100,
+    ward: Optional[str] = Query(None, description="病棟で絞り込む"),
+    fields: Optional[str] = Query(None, description="取得するフィールド（カンマ区切り）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """看護計画の一覧を取得する"""
-    nursing_plans = db.query(NursingPlan).offset(skip).limit(limit).all()
+    filters = []
+    if ward is not None:
+        # 病棟の患者は患者名簿キャッシュから解決し、看護計画テーブルは患者IDの索引で絞り込む
+        filters.append(NursingPlan.patient_id.in_(patient_directory.ward_patient_codes(db, ward)))
+    selected = parse_fields(fields, NursingPlanSchema)
+    if selected:
+        # 指定されたカラムだけをSELECTし、スキーマを介さずに返す
+        rows = db.query(*field_columns(NursingPlan, selected)).filter(*filters).offset(skip).limit(limit).all()
+        return fields_response(rows)
+    nursing_plans = db.query(NursingPlan).filter(*filters).offset(skip).limit(limit).all()
     return nursing_plans
 
 @router.post("/", response_model=NursingPlanSchema, status_code=status.HTTP_201_CREATED)
@@ -31,50 +51,76 @@ async def create_nursing_plan(
     current_user: User = Depends(get_current_active_user)
 ):
     """新しい看護計画を作成する"""
-    db_nursing_plan = NursingPlan(
+    _check_patient(db, nursing_plan.patient_id)
+    row = insert_returning(db, NursingPlan, {
         **nursing_plan.dict(),
-        created_by_id=current_user.id,
-        created_at=datetime.now()
-    )
-    db.add(db_nursing_plan)
+        "created_by_id": current_user.id,
+        "created_at": datetime.now(),
+    })
     db.commit()
-    db.refresh(db_nursing_plan)
-    return db_nursing_plan
+    return row
+
+@router.get("/changes", response_model=NursingPlanChanges)
+async def read_nursing_plan_changes(
+    since: int = Query(0, ge=0, description="前回の差分同期で受け取ったカーソル（初回は0）"),
+    limit: int = Query(MAX_CHANGES, ge=1, le=MAX_CHANGES),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """カーソル以降に変更・削除された看護計画を取得する（差分同期）"""
+    result = read_changes(db, NursingPlan, since, limit)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="カーソルが古すぎます。全件を取得し直してください")
+    return result
 
 @router.get("/{nursing_plan_id}", response_model=NursingPlanSchema)
 async def read_nursing_plan(
     nursing_plan_id: int,
+    fields: Optional[str] = Query(None, description="取得するフィールド（カンマ区切り）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """特定の看護計画を取得する"""
-    db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
-    if db_nursing_plan is None:
-        raise HTTPException(status_code=404, detail="看護計画が見つかりません")
-    return db_nursing_plan
+    selected = parse_fields(fields, NursingPlanSchema)
+    if selected:
+        row = db.query(*field_columns(NursingPlan, selected)).filter(NursingPlan.id == nursing_plan_id).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="看護計画が見つかりません")
+        return fields_response(row, many=False)
+    # 全フィールドの取得はエンコード済みのレスポンスをキャッシュから返す（更新系のエンドポイントで無効化する）
+    content, generation = response_cache.get("nursing_plans", nursing_plan_id)
+    if content is None:
+        db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
+        if db_nursing_plan is None:
+            raise HTTPException(status_code=404, detail="看護計画が見つかりません")
+        content = NursingPlanSchema.model_validate(db_nursing_plan, from_attributes=True).model_dump_json().encode()
+        response_cache.set("nursing_plans", nursing_plan_id, content, generation)
+    return Response(content=content, media_type="application/json")
 
 @router.put("/{nursing_plan_id}", response_model=NursingPlanSchema)
 async def update_nursing_plan(
     nursing_plan_id: int,
     nursing_plan: NursingPlanUpdate,
+    version: Optional[int] = Query(None, description="取得時のバージョン（指定時は他の更新との競合を検出する）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """看護計画を更新する"""
-    db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
-    if db_nursing_plan is None:
-        raise HTTPException(status_code=404, detail="看護計画が見つかりません")
-    
     update_data = nursing_plan.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_nursing_plan, key, value)
-    
-    db_nursing_plan.updated_by_id = current_user.id
-    db_nursing_plan.updated_at = datetime.now()
-    
+    _check_patient(db, update_data.get("patient_id"))
+    row = conditional_update(
+        db, NursingPlan, nursing_plan_id,
+        {**update_data, "updated_by_id": current_user.id, "updated_at": datetime.now()},
+        expected_version=version,
+    )
+    if row is None:
+        db.rollback()
+        if version is not None and current_state(db, NursingPlan, nursing_plan_id) is not None:
+            raise HTTPException(status_code=409, detail="看護計画が他のユーザーによって更新されています。最新の情報を取得してください")
+        raise HTTPException(status_code=404, detail="看護計画が見つかりません")
     db.commit()
-    db.refresh(db_nursing_plan)
-    return db_nursing_plan
+    response_cache.invalidate("nursing_plans", nursing_plan_id)
+    return row
 
 @router.delete("/{nursing_plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_nursing_plan(
@@ -83,54 +129,60 @@ async def delete_nursing_plan(
     current_user: User = Depends(get_current_active_user)
 ):
     """看護計画を削除する"""
-    db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
-    if db_nursing_plan is None:
+    if not delete_by_id(db, NursingPlan, nursing_plan_id):
         raise HTTPException(status_code=404, detail="看護計画が見つかりません")
-    
-    db.delete(db_nursing_plan)
     db.commit()
+    response_cache.invalidate("nursing_plans", nursing_plan_id)
     return {"detail": "看護計画が削除されました"}
 
 @router.put("/{nursing_plan_id}/complete", response_model=NursingPlanSchema)
 async def complete_nursing_plan(
     nursing_plan_id: int,
+    version: Optional[int] = Query(None, description="取得時のバージョン（指定時は他の更新との競合を検出する）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """看護計画を完了状態にする"""
-    db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
-    if db_nursing_plan is None:
-        raise HTTPException(status_code=404, detail="看護計画が見つかりません")
-    
-    if db_nursing_plan.status == NursingPlanStatus.CANCELLED:
-        raise HTTPException(status_code=400, detail="中止された看護計画は完了できません")
-    
-    db_nursing_plan.status = NursingPlanStatus.COMPLETED
-    db_nursing_plan.updated_by_id = current_user.id
-    db_nursing_plan.updated_at = datetime.now()
-    
+    row = conditional_update(
+        db, NursingPlan, nursing_plan_id,
+        {"status": NursingPlanStatus.COMPLETED.value, "updated_by_id": current_user.id, "updated_at": datetime.now()},
+        allowed_statuses=[NursingPlanStatus.ACTIVE.value, NursingPlanStatus.COMPLETED.value],
+        expected_version=version,
+    )
+    if row is None:
+        db.rollback()
+        state = current_state(db, NursingPlan, nursing_plan_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="看護計画が見つかりません")
+        if state.status == NursingPlanStatus.CANCELLED:
+            raise HTTPException(status_code=400, detail="中止された看護計画は完了できません")
+        raise HTTPException(status_code=409, detail="看護計画が他のユーザーによって更新されています。最新の情報を取得してください")
     db.commit()
-    db.refresh(db_nursing_plan)
-    return db_nursing_plan
+    response_cache.invalidate("nursing_plans", nursing_plan_id)
+    return row
 
 @router.put("/{nursing_plan_id}/cancel", response_model=NursingPlanSchema)
 async def cancel_nursing_plan(
     nursing_plan_id: int,
+    version: Optional[int] = Query(None, description="取得時のバージョン（指定時は他の更新との競合を検出する）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """看護計画を中止状態にする"""
-    db_nursing_plan = db.query(NursingPlan).filter(NursingPlan.id == nursing_plan_id).first()
-    if db_nursing_plan is None:
-        raise HTTPException(status_code=404, detail="看護計画が見つかりません")
-    
-    if db_nursing_plan.status == NursingPlanStatus.COMPLETED:
-        raise HTTPException(status_code=400, detail="完了した看護計画は中止できません")
-    
-    db_nursing_plan.status = NursingPlanStatus.CANCELLED
-    db_nursing_plan.updated_by_id = current_user.id
-    db_nursing_plan.updated_at = datetime.now()
-    
+    row = conditional_update(
+        db, NursingPlan, nursing_plan_id,
+        {"status": NursingPlanStatus.CANCELLED.value, "updated_by_id": current_user.id, "updated_at": datetime.now()},
+        allowed_statuses=[NursingPlanStatus.ACTIVE.value, NursingPlanStatus.CANCELLED.value],
+        expected_version=version,
+    )
+    if row is None:
+        db.rollback()
+        state = current_state(db, NursingPlan, nursing_plan_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="看護計画が見つかりません")
+        if state.status == NursingPlanStatus.COMPLETED:
+            raise HTTPException(status_code=400, detail="完了した看護計画は中止できません")
+        raise HTTPException(status_code=409, detail="看護計画が他のユーザーによって更新されています。最新の情報を取得してください")
     db.commit()
-    db.refresh(db_nursing_plan)
-    return db_nursing_plan
\ No newline at end of file
+    response_cache.invalidate("nursing_plans", nursing_plan_id)
+    return row
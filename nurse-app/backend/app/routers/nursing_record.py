@@ -1,24 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+# このファイルはnursing_record用のルーターを定義します
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.dependencies import get_current_active_user
+from app.models.user import User
+from app.nursing_records import MAX_PAGE_SIZE, append_records, decode_cursor, encode_cursor, get_record, read_timeline
+from app.patient_directory import patient_directory
+from app.schemas.common import LocalDateTime, to_local_naive
+from app.schemas.nursing_record import NursingRecordCreate, NursingRecord as NursingRecordSchema, NursingRecordPage
+
+router = APIRouter()
+
+# 一括登録できる最大件数
+MAX_BATCH_SIZE = 500
 
-from ..database import get_db
-from ..dependencies import get_current_user
+def _check_patients(db: Session, records: List[NursingRecordCreate]):
+    for patient_id in {record.patient_id for record in records}:
+        if patient_directory.get(db, patient_id) is None:
+            raise HTTPException(status_code=400, detail=f"患者 {patient_id} が見つかりません")
 
-# ここでrouterオブジェクトを定義
-router = APIRouter(prefix="/nursing-records", tags=["看護記録"])
+@router.get("/", response_model=NursingRecordPage)
+async def read_nursing_records(
+    patient_id: str = Query(..., description="患者コード"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="前のページで受け取ったnext_cursor"),
+    since: Optional[LocalDateTime] = Query(None, description="この日時以降の記録に絞り込む"),
+    until: Optional[LocalDateTime] = Query(None, description="この日時より前の記録に絞り込む"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """患者の看護記録を新しい順に取得する"""
+    position = None
+    if cursor is not None:
+        try:
+            recorded_at, record_id = decode_cursor(cursor)
+            position = (to_local_naive(recorded_at), record_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="カーソルが不正です")
+    rows, next_position = read_timeline(db, patient_id, limit, position, since, until)
+    return {
+        "records": rows,
+        "next_cursor": encode_cursor(*next_position) if next_position else None,
+    }
 
-@router.get("/")
-def get_nursing_records(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """看護記録のリストを取得する"""
-    return {"message": "看護記録一覧機能は開発中です"}
+@router.post("/", response_model=NursingRecordSchema, status_code=status.HTTP_201_CREATED)
+async def create_nursing_record(
+    record: NursingRecordCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """新しい看護記録を追加する"""
+    _check_patients(db, [record])
+    rows = append_records(db, [record.dict()], current_user.id)
+    db.commit()
+    return rows[0]
 
-@router.post("/")
-def create_nursing_record(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """新しい看護記録を登録する"""
-    return {"message": "看護記録登録機能は開発中です"}
+@router.post("/batch", response_model=List[NursingRecordSchema], status_code=status.HTTP_201_CREATED)
+async def create_nursing_records(
+    records: List[NursingRecordCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """看護記録をまとめて追加する（端末にためた記録の送信用）"""
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"一度に登録できるのは{MAX_BATCH_SIZE}件までです")
+    if not records:
+        return []
+    _check_patients(db, records)
+    rows = append_records(db, [record.dict() for record in records], current_user.id)
+    db.commit()
+    return rows
 
-@router.get("/{record_id}")
-def get_nursing_record(record_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """指定されたIDの看護記録情報を取得する"""
-    return {"message": f"看護記録ID {record_id} の詳細機能は開発中です"}
\ No newline at end of file
+@router.get("/{record_id}", response_model=NursingRecordSchema)
+async def read_nursing_record(
+    record_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """特定の看護記録を取得する"""
+    row = get_record(db, record_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="看護記録が見つかりません")
+    return row
@@ -0,0 +1,123 @@
+# このファイルはpatient用のルーターを定義します
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.crud import insert_returning, conditional_update
+from app.database import get_db
+from app.dependencies import get_current_active_user
+from app.models.user import User
+from app.models.early_warning import EarlyWarningScore
+from app.models.injection import Injection
+from app.models.nursing_plan import NursingPlan
+from app.models.patient import Patient
+from app.models.vital_signs import VitalSign
+from app.nursing_records import read_timeline
+from app.patient_directory import patient_directory
+from app.schemas.patient import PatientCreate, PatientUpdate, Patient as PatientSchema
+
+router = APIRouter()
+
+def _has_records(db: Session, patient: Patient) -> bool:
+    """患者に紐づく記録（注射実施・看護計画・バイタルサイン・早期警告スコア・看護記録）があるかどうか"""
+    checks = (
+        db.query(Injection.id).filter(Injection.patient_id == patient.patient_code),
+        db.query(NursingPlan.id).filter(NursingPlan.patient_id == patient.patient_code),
+        db.query(VitalSign.id).filter(VitalSign.patient_id == patient.id),
+        db.query(EarlyWarningScore.id).filter(EarlyWarningScore.patient_id == patient.id),
+    )
+    if any(query.first() is not None for query in checks):
+        return True
+    rows, _ = read_timeline(db, patient.patient_code, 1)
+    return bool(rows)
+
+@router.get("/")
+async def read_patients(
+    ward: Optional[str] = None,
+    active_only: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """患者の一覧を取得する（患者名簿キャッシュから返す）"""
+    entries = patient_directory.list(db, ward=ward, active_only=active_only)
+    return [entry.to_dict() for entry in entries[skip:skip + limit]]
+
+@router.get("/search")
+async def search_patients(
+    q: str = Query(..., min_length=1, description="氏名またはカナの先頭部分"),
+    ward: Optional[str] = None,
+    limit: int = Query(20, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """氏名・カナの前方一致で患者を検索する（患者名簿キャッシュから返す）"""
+    return [entry.to_dict() for entry in patient_directory.search(db, q, ward=ward, limit=limit)]
+
+@router.post("/", response_model=PatientSchema, status_code=status.HTTP_201_CREATED)
+async def create_patient(
+    patient: PatientCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """新しい患者を登録する"""
+    try:
+        row = insert_returning(db, Patient, {**patient.dict(), "created_at": datetime.now()})
+        db.commit()
+    except IntegrityError:
+        # 患者IDの重複は一意制約で検出する
+        db.rollback()
+        raise HTTPException(status_code=400, detail="この患者IDはすでに使用されています")
+    patient_directory.invalidate()
+    return row
+
+@router.get("/{patient_code}", response_model=PatientSchema)
+async def read_patient(
+    patient_code: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """特定の患者を取得する"""
+    db_patient = db.query(Patient).filter(Patient.patient_code == patient_code).first()
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="患者が見つかりません")
+    return db_patient
+
+@router.put("/{patient_code}", response_model=PatientSchema)
+async def update_patient(
+    patient_code: str,
+    patient: PatientUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """患者情報（転棟・転床など）を更新する"""
+    update_data = patient.dict(exclude_unset=True)
+    row = conditional_update(db, Patient, patient_code, {**update_data, "updated_at": datetime.now()}, key="patient_code")
+    if row is None:
+        raise HTTPException(status_code=404, detail="患者が見つかりません")
+    db.commit()
+    patient_directory.invalidate()
+    return row
+
+@router.delete("/{patient_code}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_patient(
+    patient_code: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """患者を削除する（誤って登録した、記録のない患者のみ）"""
+    db_patient = db.query(Patient).filter(Patient.patient_code == patient_code).first()
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="患者が見つかりません")
+    if _has_records(db, db_patient):
+        # 記録の患者IDが参照先を失わないよう、記録のある患者は削除せず退院（is_active=false）として扱う
+        raise HTTPException(status_code=409, detail="記録が残っている患者は削除できません。退院として更新してください")
+
+    db.delete(db_patient)
+    db.commit()
+    patient_directory.invalidate()
+    return {"detail": "患者が削除されました"}
@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
+from app.crud import insert_returning
 from app.database import get_db
+from app.early_warning import early_warning_engine
 from app.models import vital_signs as models
 from app.schemas import vital_signs as schemas
 
@@ -30,11 +32,28 @@ def check_abnormal(vital_type, value):
 @router.post("/", response_model=schemas.VitalSign)
 def create_vital_sign(vital: schemas.VitalSignCreate, db: Session = Depends(get_db)):
     is_abnormal = check_abnormal(vital.vital_type, vital.value)
-    db_vital = models.VitalSign(**vital.dict(), is_abnormal=is_abnormal)
-    db.add(db_vital)
+    row = insert_returning(db, models.VitalSign, {**vital.dict(), "is_abnormal": is_abnormal})
+    # 早期警告スコアを差分で更新し、変化した場合は同じトランザクションで記録する
+    early_warning_engine.record(db, row)
     db.commit()
-    db.refresh(db_vital)
-    return db_vital
+    return row
+
+@router.get("/early-warning/ward/{ward}", response_model=List[schemas.WardEarlyWarningEntry])
+def get_ward_early_warning(
+    ward: str,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """病棟の入院患者を早期警告スコアの高い順に取得する"""
+    return early_warning_engine.ward_ranking(db, ward, limit)
+
+@router.get("/early-warning/patient/{patient_id}", response_model=schemas.EarlyWarningScore)
+def get_patient_early_warning(patient_id: int, db: Session = Depends(get_db)):
+    """患者の現在の早期警告スコアを取得する"""
+    score = early_warning_engine.patient(db, patient_id)
+    if score is None:
+        raise HTTPException(status_code=404, detail="スコアを計算できる測定値がありません")
+    return score
 
 @router.get("/patient/{patient_id}", response_model=schemas.VitalSignsResponse)
 def get_patient_vital_signs(
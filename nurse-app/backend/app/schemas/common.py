@@ -0,0 +1,19 @@
+# このファイルはスキーマ間で共有する型を定義します
+
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+def to_local_naive(value: datetime) -> datetime:
+    """タイムゾーン付きの日時をサーバーのローカル時刻（タイムゾーンなし）に変換する
+
+    DBの日時はすべてタイムゾーンなしのローカル時刻で保存しているため、クライアントが
+    オフセット付きで送った日時はそのまま比較できない（TypeErrorになる）。
+    """
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+# リクエストで受け取る日時（オフセット付きの場合はローカル時刻に変換する）
+LocalDateTime = Annotated[datetime, AfterValidator(to_local_naive)]
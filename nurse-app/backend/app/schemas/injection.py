@@ -1,7 +1,7 @@
 # このファイルはinjectionスキーマを定義します
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -78,6 +78,20 @@ class Injection(InjectionBase):
     created_at: datetime
     updated_by_id: Optional[int] = None
     updated_at: Optional[datetime] = None
+    version: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class InjectionChange(BaseModel):
+    """注射実施の1件の変更"""
+    change_seq: int  # 変更連番（この順に適用する）
+    id: int
+    deleted: bool  # 削除された場合はTrue（recordはNone）
+    record: Optional[Injection] = None  # 作成・更新後の注射実施
+
+class InjectionChanges(BaseModel):
+    """注射実施の差分同期スキーマ"""
+    changes: List[InjectionChange]  # カーソル以降の作成・更新・削除（変更連番順）
+    cursor: int  # 次回の差分同期で指定するカーソル
+    has_more: bool  # 続きがある場合はTrue
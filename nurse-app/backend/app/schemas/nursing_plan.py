@@ -44,6 +44,20 @@ class NursingPlan(NursingPlanBase):
     created_at: datetime
     updated_by_id: Optional[int] = None
     updated_at: Optional[datetime] = None
+    version: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NursingPlanChange(BaseModel):
+    """看護計画の1件の変更"""
+    change_seq: int  # 変更連番（この順に適用する）
+    id: int
+    deleted: bool  # 削除された場合はTrue（recordはNone）
+    record: Optional[NursingPlan] = None  # 作成・更新後の看護計画
+
+class NursingPlanChanges(BaseModel):
+    """看護計画の差分同期スキーマ"""
+    changes: List[NursingPlanChange]  # カーソル以降の作成・更新・削除（変更連番順）
+    cursor: int  # 次回の差分同期で指定するカーソル
+    has_more: bool  # 続きがある場合はTrue
@@ -0,0 +1,41 @@
+# このファイルはnursing_recordスキーマを定義します
+
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+from app.schemas.common import LocalDateTime
+
+class NursingRecordType(str, Enum):
+    """看護記録の種類"""
+    PROGRESS = "経過記録"
+    SOAP = "SOAP"
+    FOCUS = "フォーカスチャーティング"
+    OBSERVATION = "観察記録"
+    OTHER = "その他"
+
+class NursingRecordBase(BaseModel):
+    """看護記録ベーススキーマ"""
+    patient_id: str
+    record_type: NursingRecordType = NursingRecordType.PROGRESS
+    content: str
+
+class NursingRecordCreate(NursingRecordBase):
+    """看護記録作成スキーマ"""
+    recorded_at: Optional[LocalDateTime] = None  # 省略時は登録日時
+
+class NursingRecord(NursingRecordBase):
+    """看護記録表示スキーマ"""
+    id: int
+    recorded_at: datetime
+    created_by_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class NursingRecordPage(BaseModel):
+    """看護記録の時系列（新しい順）の1ページ"""
+    records: List[NursingRecord]
+    next_cursor: Optional[str] = None  # 続きを取得する場合に指定するカーソル（最後のページではNone）
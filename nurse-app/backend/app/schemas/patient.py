@@ -0,0 +1,35 @@
+# このファイルはpatientスキーマを定義します
+
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class PatientBase(BaseModel):
+    """患者ベーススキーマ"""
+    patient_code: str
+    name: str
+    name_kana: str
+    ward: str
+    bed: Optional[str] = None
+    is_active: bool = True
+
+class PatientCreate(PatientBase):
+    """患者作成スキーマ"""
+    pass
+
+class PatientUpdate(BaseModel):
+    """患者更新スキーマ"""
+    name: Optional[str] = None
+    name_kana: Optional[str] = None
+    ward: Optional[str] = None
+    bed: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class Patient(PatientBase):
+    """患者表示スキーマ"""
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,46 @@
+# このファイルはvital_signsスキーマを定義します
+
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+class VitalSignBase(BaseModel):
+    """バイタルサインベーススキーマ"""
+    patient_id: int
+    vital_type: str
+    value: float
+    unit: str
+    notes: Optional[str] = None
+
+class VitalSignCreate(VitalSignBase):
+    """バイタルサイン作成スキーマ"""
+    pass
+
+class VitalSign(VitalSignBase):
+    """バイタルサイン表示スキーマ"""
+    id: int
+    timestamp: datetime
+    is_abnormal: bool
+
+    class Config:
+        from_attributes = True
+
+class VitalSignsResponse(BaseModel):
+    """患者ごとのバイタルサイン一覧スキーマ"""
+    vital_signs: List[VitalSign]
+    abnormal_count: int
+
+class EarlyWarningScore(BaseModel):
+    """早期警告スコア（NEWS2準拠）スキーマ"""
+    score: int
+    risk: str  # 'low', 'low_medium', 'medium', 'high'
+    components: Dict[str, int]  # 項目ごとの点数
+    latest: Dict[str, float]  # 項目ごとの最新値
+    last_observed_at: datetime
+
+class WardEarlyWarningEntry(EarlyWarningScore):
+    """病棟の早期警告スコア一覧の1患者分"""
+    id: int
+    patient_code: str
+    name: str
+    bed: Optional[str] = None
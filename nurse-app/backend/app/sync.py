@@ -0,0 +1,136 @@
+# このファイルはオフライン対応端末向けの差分同期処理を定義します
+#
+# 差分同期の対象となるテーブルは change_seq カラムを持ち、作成・更新のたびに
+# リソースごとのカウンターから採番した連番を記録します。削除は sync_tombstones に
+# 同じ連番で記録します。端末は前回受け取ったカーソル（連番）以降の変更だけを取得します。
+#
+# カウンターの行はトランザクションの終了までロックされるため、連番の順序とコミットの順序が
+# 一致し、カーソルより小さい連番の変更が後からコミットされることはありません。
+#
+# その代わり、同じリソース（例: 注射実施）への書き込みは全ワーカーでカウンターの1行を
+# 奪い合い、コミットまで直列化されます。リソースごとの書き込みのスループットの上限は
+# 「1 / 採番からコミットまでの時間」程度になるため、採番した後のトランザクションは短く保ちます
+# （crud の書き込みは採番と書き込みの2文でコミットする）。異なるリソースのカウンターは競合しません。
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.coordination import register_background_task
+from app.database import SessionLocal
+from app.models.sync import SyncCounter, SyncTombstone
+
+logger = logging.getLogger(__name__)
+
+# 削除記録の保持日数（これより古いカーソルからの差分同期は再同期が必要になる）
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+# 差分同期で一度に返す最大件数
+MAX_CHANGES = 1000
+
+def next_change_seq(db: Session, resource: str, count: int = 1) -> int:
+    """変更連番を採番し、採番した範囲の先頭を返す"""
+    counters = SyncCounter.__table__
+    statement = (
+        update(counters)
+        .where(counters.c.name == resource)
+        .values(value=counters.c.value + count)
+    )
+    if db.get_bind().dialect.update_returning:
+        value = db.execute(statement.returning(counters.c.value)).scalar()
+    else:
+        value = None
+        if db.execute(statement).rowcount:
+            value = db.execute(select(counters.c.value).where(counters.c.name == resource)).scalar()
+    if value is None:
+        # 初回のみカウンターの行を作成する（同時に作成された場合は採番をやり直す）
+        try:
+            with db.begin_nested():
+                db.execute(insert(counters).values(name=resource, value=count))
+            value = count
+        except IntegrityError:
+            return next_change_seq(db, resource, count)
+    return value - count + 1
+
+def _purged_counter(resource: str) -> str:
+    return f"{resource}:purged"
+
+def record_tombstone(db: Session, resource: str, resource_id: int):
+    """削除を記録する"""
+    db.execute(insert(SyncTombstone.__table__).values(
+        resource=resource,
+        resource_id=resource_id,
+        change_seq=next_change_seq(db, resource),
+        deleted_at=datetime.now(),
+    ))
+
+def read_changes(db: Session, model, since: int, limit: int = MAX_CHANGES) -> Optional[dict]:
+    """カーソル以降の変更（作成・更新された行と削除）を1つのリストにして連番順に返す
+
+    同じIDの更新と削除が同じページに含まれても、端末は先頭から順に適用すればよい。
+    消去済みの削除記録より前のカーソルが指定された場合はNoneを返す（全件の再取得が必要）。
+    初回（カーソル0）は削除を伝える必要がないため常に取得できる。
+    """
+    table = model.__table__
+    resource = table.name
+    purged = db.query(SyncCounter.value).filter(SyncCounter.name == _purged_counter(resource)).scalar()
+    if since and purged is not None and since < purged:
+        return None
+
+    rows = db.execute(
+        select(*table.c).where(table.c.change_seq > since).order_by(table.c.change_seq).limit(limit + 1)
+    ).mappings().all()
+    tombstones = db.query(SyncTombstone.resource_id, SyncTombstone.change_seq).filter(
+        SyncTombstone.resource == resource,
+        SyncTombstone.change_seq > since,
+    ).order_by(SyncTombstone.change_seq).limit(limit + 1).all()
+
+    # 行と削除記録を連番順に併合し、先頭からlimit件を返す
+    events = sorted(
+        [(row["change_seq"], "change", row) for row in rows]
+        + [(tombstone.change_seq, "delete", tombstone.resource_id) for tombstone in tombstones],
+        key=lambda event: event[0],
+    )
+    page = events[:limit]
+    return {
+        "changes": [
+            {"change_seq": seq, "id": item, "deleted": True, "record": None} if kind == "delete"
+            else {"change_seq": seq, "id": item["id"], "deleted": False, "record": dict(item)}
+            for seq, kind, item in page
+        ],
+        "cursor": page[-1][0] if page else since,
+        "has_more": len(events) > limit,
+    }
+
+def purge_tombstones(db: Session, older_than: datetime):
+    """保持期間を過ぎた削除記録を消去し、消去した最大の連番を記録する"""
+    rows = db.query(SyncTombstone.resource, func.max(SyncTombstone.change_seq)).filter(
+        SyncTombstone.deleted_at < older_than
+    ).group_by(SyncTombstone.resource).all()
+    for resource, max_seq in rows:
+        db.query(SyncTombstone).filter(
+            SyncTombstone.resource == resource,
+            SyncTombstone.change_seq <= max_seq,
+        ).delete(synchronize_session=False)
+        name = _purged_counter(resource)
+        if db.query(SyncCounter).filter(SyncCounter.name == name).update({"value": max_seq}) == 0:
+            db.add(SyncCounter(name=name, value=max_seq))
+    db.commit()
+
+@register_background_task
+def tombstone_purger(stop_event: threading.Event):
+    """削除記録の定期消去タスク（リーダーワーカーでのみ実行される）"""
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            purge_tombstones(db, datetime.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+        except Exception:
+            logger.exception("削除記録の消去に失敗しました")
+        finally:
+            db.close()
+        stop_event.wait(3600)
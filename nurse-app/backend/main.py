@@ -3,14 +3,19 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
+import os
 import uvicorn
 
-from app.routers import injection, treatment, nursing_plan, nursing_record, auth
-from app.database import engine, Base
+from app.routers import injection, treatment, nursing_plan, nursing_record, auth, admin, bulk_import, patient, vital_signs, handover
+from app.database import init_db
 from app.dependencies import get_current_user
+from app.coordination import start_background_tasks, stop_background_tasks
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.profiling import ProfilingMiddleware
 
 # データベースの初期化
-Base.metadata.create_all(bind=engine)
+# serve.py（app preload）経由ではマスタープロセスで一度だけ実行される
+init_db()
 
 app = FastAPI(
     title="看護支援アプリAPI",
@@ -18,6 +23,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# プロファイリング（受付制御より内側に置き、受け付けたリクエストだけを計測する）
+app.add_middleware(ProfilingMiddleware)
+
+# 受付制御（CORSより内側に置き、拒否レスポンスにもCORSヘッダーを付ける）
+app.add_middleware(AdmissionControlMiddleware)
+
 # CORS設定
 origins = [
     "http://localhost:3000",  # Next.jsのデフォルトポート
@@ -58,6 +69,44 @@ app.include_router(
     tags=["看護記録"],
     dependencies=[Depends(get_current_user)]
 )
+app.include_router(
+    patient.router,
+    prefix="/api/patients",
+    tags=["患者"],
+    dependencies=[Depends(get_current_user)]
+)
+app.include_router(
+    vital_signs.router,
+    tags=["バイタルサイン"],
+    dependencies=[Depends(get_current_user)]
+)
+app.include_router(
+    handover.router,
+    prefix="/api/handover",
+    tags=["申し送り"],
+    dependencies=[Depends(get_current_user)]
+)
+app.include_router(
+    bulk_import.router,
+    prefix="/api/import",
+    tags=["一括インポート"],
+    dependencies=[Depends(get_current_user)]
+)
+app.include_router(
+    admin.router,
+    prefix="/api/admin",
+    tags=["管理"],
+    dependencies=[Depends(get_current_user)]
+)
+
+@app.on_event("startup")
+async def on_startup():
+    # バックグラウンドタスクはリーダーワーカーでのみ起動する
+    start_background_tasks()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_background_tasks()
 
 @app.get("/")
 async def root():
@@ -68,4 +117,5 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # 開発用サーバー（本番環境では serve.py を使用する）
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=os.getenv("RELOAD", "true").lower() == "true")
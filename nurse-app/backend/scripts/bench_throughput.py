@@ -0,0 +1,75 @@
+# このファイルはエントリーポイントごとのスループットを比較するためのベンチマークです
+#
+# 使い方（backendディレクトリで実行）:
+#   RELOAD=false python main.py &        # 現行の単一プロセス起動
+#   python -m scripts.bench_throughput --url http://localhost:8000/health
+#
+#   WEB_CONCURRENCY=4 python serve.py &  # 本番用の複数ワーカー起動
+#   python -m scripts.bench_throughput --url http://localhost:8000/health
+#
+# 認証が必要なエンドポイントを計測する場合は --token にアクセストークンを指定します。
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+
+def worker(url, token, deadline, latencies, errors, lock):
+    """締め切りまでリクエストを送り続ける"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(url, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            local_latencies.append(time.perf_counter() - started)
+        except Exception:
+            local_errors += 1
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+def run(url, concurrency, duration, token=None):
+    """指定した並列数でベンチマークを実行し、結果を返す"""
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, token, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "throughput": len(latencies) / duration,
+    }
+    if latencies:
+        result["p50_ms"] = statistics.median(latencies) * 1000
+        result["p99_ms"] = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="APIサーバーのスループットを計測する")
+    parser.add_argument("--url", default="http://localhost:8000/health")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--token", default=None)
+    args = parser.parse_args()
+
+    result = run(args.url, args.concurrency, args.duration, args.token)
+    print(f"リクエスト数: {result['requests']}  エラー数: {result['errors']}")
+    print(f"スループット: {result['throughput']:.1f} req/s")
+    if "p50_ms" in result:
+        print(f"レイテンシ: p50={result['p50_ms']:.1f}ms  p99={result['p99_ms']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# このファイルは過去データを一括インポートするためのコマンドです
+#
+# 使い方（backendディレクトリで実行）:
+#   python -m scripts.bulk_import injections mar_2024.csv --user admin --reject-file rejects.ndjson
+#   python -m scripts.bulk_import nursing-plans plans.ndjson --user admin
+#
+# 中断した場合は同じコマンド（同じ --job）を再実行すると、取り込み済みのレコードを読み飛ばして再開します。
+# --job を省略した場合のジョブ名にはファイルの内容のハッシュが含まれるため、同じパスのファイルを
+# 差し替えて実行すると別のジョブとして最初から取り込みます。
+
+import argparse
+import os
+import sys
+
+from app.bulk_import import IMPORT_FORMATS, IMPORT_TARGETS, DEFAULT_CHUNK_SIZE, RejectFileWriter, default_job_name, detect_format, run_import
+from app.database import SessionLocal, init_db
+from app.models.user import User
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV/NDJSONファイルから注射実施・看護計画を一括インポートする")
+    parser.add_argument("target", choices=list(IMPORT_TARGETS))
+    parser.add_argument("path")
+    parser.add_argument("--user", required=True, help="作成者として記録するユーザー名")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None)
+    parser.add_argument("--job", default=None, help="チェックポイントのジョブ名（デフォルト: 対象・ファイルの絶対パス・内容のハッシュ）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--reject-file", default=None, help="不正なレコードの書き出し先（NDJSON、追記）")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    reject_file = open(args.reject_file, "a", encoding="utf-8") if args.reject_file else None
+    try:
+        user = db.query(User).filter(User.username == args.user).first()
+        if user is None:
+            parser.error(f"ユーザー {args.user} が見つかりません")
+
+        def on_progress(result):
+            print(f"\r{result.last_record} 件目まで処理 "
+                  f"(登録: {result.inserted}, 不正: {result.rejected})", end="", file=sys.stderr)
+
+        job_name = args.job
+        if job_name is None:
+            with open(args.path, "rb") as binary:
+                job_name = default_job_name(args.target, os.path.abspath(args.path), binary)
+
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            result = run_import(
+                db, stream, args.target, args.format or detect_format(args.path), user.id,
+                job_name=job_name,
+                chunk_size=max(1, args.chunk_size),
+                on_reject=RejectFileWriter(reject_file) if reject_file else None,
+                on_progress=on_progress,
+            )
+        print(file=sys.stderr)
+        if result.skipped:
+            print(f"チェックポイントから再開しました（{result.skipped} 件を読み飛ばし）")
+        print(f"完了: 登録 {result.inserted} 件、不正 {result.rejected} 件")
+    finally:
+        if reject_file:
+            reject_file.close()
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# このファイルは容量試験用の合成データを生成するコマンドです
+#
+# 使い方（backendディレクトリで実行）:
+#   DATABASE_URL=sqlite:///./capacity.db python -m scripts.generate_data --wards 50 --beds-per-ward 40 --days 365
+#   DATABASE_URL=postgresql://... python -m scripts.generate_data --seed 7 --vital-rounds 6 --end 2026-04-01
+#
+# 患者テーブルが空のデータベースに対して実行します。同じ引数（--seed と --end を含む）であれば
+# 同じデータが生成されます。生成されるユーザーのパスワードはすべて --password の値です。
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import SessionLocal, init_db
+from app.models.injection import Injection
+from app.models.nursing_plan import NursingPlan
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.vital_signs import VitalSign
+from app.routers.auth import get_password_hash
+from app.routers.vital_signs import VITAL_THRESHOLDS, check_abnormal
+from app.sync import next_change_seq
+
+# 姓（漢字, ふりがな）
+SURNAMES = [
+    ("佐藤", "さとう"), ("鈴木", "すずき"), ("高橋", "たかはし"), ("田中", "たなか"), ("伊藤", "いとう"),
+    ("渡辺", "わたなべ"), ("山本", "やまもと"), ("中村", "なかむら"), ("小林", "こばやし"), ("加藤", "かとう"),
+    ("吉田", "よしだ"), ("山田", "やまだ"), ("佐々木", "ささき"), ("山口", "やまぐち"), ("松本", "まつもと"),
+    ("井上", "いのうえ"), ("木村", "きむら"), ("林", "はやし"), ("斎藤", "さいとう"), ("清水", "しみず"),
+    ("山崎", "やまざき"), ("森", "もり"), ("池田", "いけだ"), ("橋本", "はしもと"), ("阿部", "あべ"),
+    ("石川", "いしかわ"), ("前田", "まえだ"), ("藤田", "ふじた"), ("小川", "おがわ"), ("岡田", "おかだ"),
+]
+# 名（漢字, ふりがな）
+GIVEN_NAMES = [
+    ("太郎", "たろう"), ("一郎", "いちろう"), ("健太", "けんた"), ("翔太", "しょうた"), ("大輔", "だいすけ"),
+    ("誠", "まこと"), ("浩", "ひろし"), ("茂", "しげる"), ("勇", "いさむ"), ("清", "きよし"),
+    ("花子", "はなこ"), ("陽子", "ようこ"), ("恵子", "けいこ"), ("裕子", "ゆうこ"), ("美咲", "みさき"),
+    ("由美", "ゆみ"), ("和子", "かずこ"), ("幸子", "さちこ"), ("久美子", "くみこ"), ("明美", "あけみ"),
+    ("直樹", "なおき"), ("拓也", "たくや"), ("真由美", "まゆみ"), ("愛", "あい"), ("節子", "せつこ"),
+]
+# 注射薬（薬剤名, 用量, 投与経路, 1日の投与回数）
+MEDICATIONS = [
+    ("セファゾリンナトリウム注射用", "1g", "静脈注射", 3),
+    ("セフトリアキソンナトリウム静注用", "1g", "静脈注射", 1),
+    ("メロペネム点滴静注用", "0.5g", "静脈注射", 3),
+    ("アセトアミノフェン静注液", "1000mg", "静脈注射", 4),
+    ("フロセミド注", "20mg", "静脈注射", 1),
+    ("ファモチジン静注", "20mg", "静脈注射", 2),
+    ("生理食塩液", "500mL", "静脈注射", 2),
+    ("ソリタ-T3号輸液", "500mL", "静脈注射", 3),
+    ("インスリン グラルギン", "10単位", "皮下注射", 1),
+    ("インスリン アスパルト", "4単位", "皮下注射", 3),
+    ("エノキサパリンナトリウム皮下注", "2000IU", "皮下注射", 2),
+    ("ヘパリンナトリウム注", "5000単位", "皮下注射", 2),
+    ("メトクロプラミド注", "10mg", "筋肉注射", 1),
+    ("ペンタゾシン注", "15mg", "筋肉注射", 1),
+    ("ヒドロキシジン塩酸塩注", "25mg", "筋肉注射", 1),
+    ("ツベルクリン反応液", "0.1mL", "皮内注射", 1),
+]
+# 看護問題（問題, 目標, 看護介入）
+NURSING_PROBLEMS = [
+    ("転倒・転落リスク", "入院中に転倒・転落しない", ["ベッド柵の使用", "ナースコールの位置確認", "夜間の巡視強化"]),
+    ("褥瘡リスク", "新たな褥瘡が発生しない", ["2時間ごとの体位変換", "皮膚状態の観察", "体圧分散マットレスの使用"]),
+    ("感染リスク", "感染徴候が出現しない", ["カテーテル挿入部の観察", "手指衛生の徹底", "体温の推移の観察"]),
+    ("急性疼痛", "疼痛がNRS3以下で経過する", ["疼痛評価（NRS）", "指示による鎮痛薬の投与", "安楽な体位の工夫"]),
+    ("栄養摂取不足", "食事摂取量が7割以上になる", ["摂取量の記録", "嗜好の確認", "栄養サポートチームへの相談"]),
+    ("せん妄リスク", "せん妄を発症しない", ["日中の離床促進", "見当識への働きかけ", "睡眠リズムの調整"]),
+    ("活動耐性低下", "病棟内を歩行できる", ["段階的な離床", "リハビリとの連携", "活動前後のバイタル測定"]),
+    ("セルフケア不足", "清潔行動を自立して行える", ["清拭・更衣の援助", "できる動作の見守り", "家族への指導"]),
+]
+# バイタルサインの平均値と標準偏差
+VITAL_DISTRIBUTIONS = {
+    "temperature": (36.6, 0.4, 1),
+    "blood_pressure_systolic": (124, 16, 0),
+    "blood_pressure_diastolic": (74, 10, 0),
+    "pulse": (78, 12, 0),
+    "spo2": (97, 1.5, 0),
+    "respiration": (16, 3, 0),
+}
+
+class Stay:
+    """1回の入院（患者1人と病床の割り当て）"""
+
+    def __init__(self, number, ward, bed, admitted, discharged, name, name_kana):
+        self.patient_code = f"P{number:08d}"
+        self.patient_id = None  # DBが採番した患者ID（患者の挿入後に設定する）
+        self.ward = ward
+        self.bed = bed
+        self.admitted = admitted
+        self.discharged = discharged  # 期間末時点で入院中の場合はNone
+        self.name = name
+        self.name_kana = name_kana
+
+def random_name(rng: random.Random):
+    surname, surname_kana = rng.choice(SURNAMES)
+    given, given_kana = rng.choice(GIVEN_NAMES)
+    return f"{surname} {given}", f"{surname_kana} {given_kana}"
+
+def generate_stays(rng: random.Random, args, start: datetime, end: datetime):
+    """病床ごとに入退院を繰り返して入院の一覧を作る（平均在院日数と病床稼働率に従う）"""
+    stays = []
+    mean_gap = args.mean_stay * (1 - args.occupancy) / args.occupancy
+    for ward_number in range(1, args.wards + 1):
+        ward = f"{ward_number}病棟"
+        for bed_number in range(1, args.beds_per_ward + 1):
+            # 期間の開始時点ですでに入院中の患者から始める
+            admitted = start - timedelta(days=rng.uniform(0, args.mean_stay))
+            while admitted < end:
+                length = max(1.0, rng.gammavariate(2, args.mean_stay / 2))
+                discharged = admitted + timedelta(days=length)
+                name, name_kana = random_name(rng)
+                stays.append(Stay(
+                    len(stays) + 1, ward, f"{bed_number:02d}", admitted,
+                    discharged if discharged < end else None, name, name_kana,
+                ))
+                admitted = discharged + timedelta(days=rng.expovariate(1 / mean_gap) if mean_gap > 0 else 0)
+    return stays
+
+def stay_days(stay: Stay, start: datetime, end: datetime):
+    """入院中の日付（期間内のみ）を返す"""
+    day = max(stay.admitted, start).replace(hour=0, minute=0, second=0, microsecond=0)
+    last = stay.discharged or end
+    while day < last:
+        yield day
+        day += timedelta(days=1)
+
+def user_rows(rng, args, password_hash, nurse_wards: dict):
+    """管理者1人と病棟ごとの看護師を作る（看護師の所属病棟をnurse_wardsに記録する）"""
+    yield {
+        "username": "admin", "email": "admin@example.com", "full_name": "管理者",
+        "hashed_password": password_hash, "is_active": True, "is_admin": True,
+    }
+    for ward_number in range(1, args.wards + 1):
+        for number in range(1, args.nurses_per_ward + 1):
+            name, _ = random_name(rng)
+            username = f"nurse{ward_number:02d}{number:03d}"
+            nurse_wards[username] = f"{ward_number}病棟"
+            yield {
+                "username": username, "email": f"{username}@example.com", "full_name": name,
+                "hashed_password": password_hash, "is_active": True, "is_admin": False,
+            }
+
+def patient_rows(stays, end):
+    for stay in stays:
+        yield {
+            "patient_code": stay.patient_code, "name": stay.name,
+            "name_kana": stay.name_kana, "ward": stay.ward, "bed": stay.bed,
+            "is_active": stay.discharged is None, "created_at": stay.admitted,
+            "updated_at": stay.discharged,
+        }
+
+def injection_rows(rng, args, stays, start, end, nurses):
+    """入院ごとに1〜3剤の指示を出し、入院中の毎日の投与予定を作る（end以降は未実施）"""
+    for stay in stays:
+        ward_nurses = nurses[stay.ward]
+        orders = rng.sample(MEDICATIONS, k=rng.randint(1, 3))
+        for day in stay_days(stay, start, end):
+            for medication, dose, route, times_per_day in orders:
+                for slot in range(times_per_day):
+                    scheduled = day + timedelta(hours=6 + slot * 16 // times_per_day, minutes=rng.choice((0, 30)))
+                    nurse_id, nurse_name = rng.choice(ward_nurses)
+                    administered = scheduled < end and rng.random() < 0.96
+                    status = "administered" if administered else ("cancelled" if scheduled < end else "scheduled")
+                    yield {
+                        "patient_id": stay.patient_code, "patient_name": stay.name,
+                        "medication": medication, "dose": dose, "route": route,
+                        "scheduled_time": scheduled,
+                        "administered_time": scheduled + timedelta(minutes=rng.randint(-10, 40)) if administered else None,
+                        "administered_by": nurse_name if administered else None,
+                        "status": status, "notes": None, "version": 1,
+                        "created_by_id": nurse_id, "created_at": scheduled - timedelta(hours=12),
+                    }
+
+def nursing_plan_rows(rng, args, stays, start, end, nurses):
+    """入院ごとに1〜3件の看護計画を作る（退院済みの入院の計画は終了させる）"""
+    for stay in stays:
+        if (stay.discharged or end) < start:
+            continue
+        for problem, goal, interventions in rng.sample(NURSING_PROBLEMS, k=rng.randint(1, 3)):
+            nurse_id, _ = rng.choice(nurses[stay.ward])
+            if stay.discharged is None:
+                status = "active"
+            else:
+                status = "completed" if rng.random() < 0.85 else "cancelled"
+            yield {
+                "patient_id": stay.patient_code, "patient_name": stay.name,
+                "problem": problem, "goal": goal, "interventions": interventions,
+                "start_date": stay.admitted, "target_date": stay.admitted + timedelta(days=args.mean_stay),
+                "status": status,
+                "evaluation_notes": "目標達成" if status == "completed" else None,
+                "version": 1, "created_by_id": nurse_id, "created_at": stay.admitted,
+                "updated_by_id": nurse_id if status != "active" else None,
+                "updated_at": stay.discharged if status != "active" else None,
+            }
+
+def vital_sign_rows(rng, args, stays, start, end):
+    """入院中の各測定回に6項目のバイタルサインを作る"""
+    interval = timedelta(hours=24 / args.vital_rounds)
+    for stay in stays:
+        # 患者ごとに基準値をずらし、一部の患者は状態が悪化していく
+        baseline = {vital_type: rng.gauss(0, sd / 2) for vital_type, (_, sd, _) in VITAL_DISTRIBUTIONS.items()}
+        deteriorating = rng.random() < 0.05
+        for day_number, day in enumerate(stay_days(stay, start, end)):
+            drift = min(day_number / 10, 1.0) if deteriorating else 0.0
+            for round_number in range(args.vital_rounds):
+                measured = day + interval * round_number + timedelta(minutes=rng.randint(0, 30))
+                if measured >= end:
+                    break
+                for vital_type, (mean, sd, digits) in VITAL_DISTRIBUTIONS.items():
+                    value = mean + baseline[vital_type] + rng.gauss(0, sd / 2)
+                    if drift:
+                        value += drift * sd * (-2 if vital_type in ("spo2", "blood_pressure_systolic") else 2)
+                    if vital_type == "spo2":
+                        value = min(value, 100)
+                    value = round(value, digits)
+                    yield {
+                        "patient_id": stay.patient_id, "timestamp": measured, "vital_type": vital_type,
+                        "value": value, "unit": VITAL_THRESHOLDS[vital_type]["unit"],
+                        "is_abnormal": check_abnormal(vital_type, value), "notes": None,
+                    }
+
+def bulk_insert(db, model, rows, chunk_size: int, label: str) -> int:
+    """行をチャンクごとにexecutemanyで挿入してコミットする"""
+    table = model.__table__
+    stamp_changes = "change_seq" in table.c
+    count = 0
+    started = time.perf_counter()
+
+    def flush(chunk):
+        if stamp_changes:
+            first = next_change_seq(db, table.name, len(chunk))
+            for offset, row in enumerate(chunk):
+                row["change_seq"] = first + offset
+        db.execute(insert(table), chunk)
+        db.commit()
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            count += len(chunk)
+            chunk = []
+            print(f"\r{label}: {count} 件", end="", file=sys.stderr)
+    if chunk:
+        flush(chunk)
+        count += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"\r{label}: {count} 件 ({elapsed:.1f} 秒, {count / max(elapsed, 1e-9):,.0f} 件/秒)", file=sys.stderr)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="容量試験用の合成データ（ユーザー・患者・注射実施・看護計画・バイタル）を生成する")
+    parser.add_argument("--wards", type=int, default=50)
+    parser.add_argument("--beds-per-ward", type=int, default=40)
+    parser.add_argument("--nurses-per-ward", type=int, default=25)
+    parser.add_argument("--days", type=int, default=365, help="生成する履歴の日数")
+    parser.add_argument("--end", default=None, help="履歴の最終日（YYYY-MM-DD、デフォルト: 今日）")
+    parser.add_argument("--mean-stay", type=float, default=14, help="平均在院日数")
+    parser.add_argument("--occupancy", type=float, default=0.9, help="病床稼働率（0〜1）")
+    parser.add_argument("--vital-rounds", type=int, default=3, help="1日あたりのバイタル測定回数（1回で6項目）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password", help="生成するユーザーのパスワード")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+    if not 0 < args.occupancy <= 1:
+        parser.error("--occupancy は0より大きく1以下である必要があります")
+    if args.nurses_per_ward < 1:
+        # 注射実施・看護計画の担当者は病棟の看護師から選ぶため、各病棟に1人以上必要
+        parser.error("--nurses-per-ward は1以上である必要があります")
+
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else datetime.now()
+    end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start = end - timedelta(days=args.days)
+    rng = random.Random(args.seed)
+    chunk_size = max(1, args.chunk_size)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Patient.id).first() is not None:
+            parser.error("患者テーブルが空ではありません。空のデータベース（DATABASE_URL）を指定してください")
+        if db.get_bind().dialect.name == "sqlite":
+            # 生成中のみ同期書き込みを省略する（中断した場合はデータベースを作り直す）
+            db.execute(text("PRAGMA synchronous = OFF"))
+            db.execute(text("PRAGMA journal_mode = MEMORY"))
+
+        stays = generate_stays(rng, args, start, end)
+        nurse_wards = {}
+        bulk_insert(db, User, user_rows(rng, args, get_password_hash(args.password), nurse_wards), chunk_size, "ユーザー")
+        nurses = {}
+        for user_id, username, full_name in db.query(User.id, User.username, User.full_name).order_by(User.id):
+            if username in nurse_wards:
+                nurses.setdefault(nurse_wards[username], []).append((user_id, full_name))
+        bulk_insert(db, Patient, patient_rows(stays, end), chunk_size, "患者")
+        # 患者IDはDBに採番させ（PostgreSQLのシーケンスを進めるため）、患者コードから対応付ける
+        patient_ids = dict(db.query(Patient.patient_code, Patient.id))
+        for stay in stays:
+            stay.patient_id = patient_ids[stay.patient_code]
+        bulk_insert(db, NursingPlan, nursing_plan_rows(rng, args, stays, start, end, nurses), chunk_size, "看護計画")
+        # 最終日の正午を現在時刻とみなし、それ以降の注射は未実施（予定）とする
+        as_of = end - timedelta(hours=12)
+        bulk_insert(db, Injection, injection_rows(rng, args, stays, start, as_of, nurses), chunk_size, "注射実施")
+        bulk_insert(db, VitalSign, vital_sign_rows(rng, args, stays, start, as_of), chunk_size, "バイタルサイン")
+        print(f"完了: {args.wards} 病棟、{args.wards * args.beds_per_ward} 床、{len(stays)} 入院、"
+              f"{start:%Y-%m-%d} 〜 {end - timedelta(days=1):%Y-%m-%d}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
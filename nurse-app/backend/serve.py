@@ -0,0 +1,106 @@
+# このファイルは本番環境用のエントリーポイントです
+#
+# 開発時は main.py（reload=True の単一プロセス）を使用し、本番運用ではこのファイルから
+# 複数ワーカーで起動します。設定はすべて環境変数で行います。
+#
+#   HOST                 待ち受けアドレス（デフォルト: 0.0.0.0）
+#   PORT                 待ち受けポート（デフォルト: 8000）
+#   WEB_CONCURRENCY      ワーカープロセス数（デフォルト: CPUコア数）
+#   MAX_REQUESTS         指定リクエスト数を処理したワーカーを再起動する（0で無効、デフォルト: 1000）
+#   MAX_REQUESTS_JITTER  再起動タイミングを分散させるための揺らぎ（デフォルト: 100）
+#   GRACEFUL_TIMEOUT     停止時に処理中リクエストの完了を待つ秒数（デフォルト: 30）
+#   TIMEOUT              応答のないワーカーを強制終了するまでの秒数（デフォルト: 60）
+#   KEEPALIVE            Keep-Aliveの待機秒数（デフォルト: 5）
+#   PRELOAD_APP          マスタープロセスでアプリを事前読み込みする（デフォルト: true）
+#   LOG_LEVEL            ログレベル（デフォルト: info）
+#
+# gunicorn が利用できない環境（Windowsなど）では uvicorn のマルチワーカーモードで起動します。
+# MAX_REQUESTS で終了したワーカーを uvicorn が起動し直すのは 0.30 以降のため、それより前の
+# バージョンではこのモードのワーカーの再起動を無効にします。
+
+import logging
+import multiprocessing
+import os
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# アプリ側（レスポンスキャッシュの有効期限など）がワーカー数を参照できるよう、読み込み前に確定値を設定する
+os.environ["WEB_CONCURRENCY"] = str(WORKERS)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "1000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+TIMEOUT = int(os.getenv("TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+PRELOAD_APP = os.getenv("PRELOAD_APP", "true").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+def post_fork(server, worker):
+    """フォーク後にマスタープロセスから引き継いだDB接続を破棄する"""
+    from app.database import engine
+    engine.dispose(close=False)
+
+def run_gunicorn():
+    """gunicorn + uvicornワーカーで起動する"""
+    from gunicorn.app.base import BaseApplication
+
+    class NurseApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{HOST}:{PORT}",
+                "workers": WORKERS,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "timeout": TIMEOUT,
+                "keepalive": KEEPALIVE,
+                "preload_app": PRELOAD_APP,
+                "loglevel": LOG_LEVEL,
+                "post_fork": post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            # 事前読み込み時はマスタープロセスの接続をフォーク前に閉じておく
+            from app.database import engine
+            engine.dispose()
+            return app
+
+    NurseApplication().run()
+
+def _supports_worker_restart() -> bool:
+    major, minor = (int(part) for part in uvicorn.__version__.split(".")[:2])
+    return (major, minor) >= (0, 30)
+
+def run_uvicorn():
+    """uvicornのマルチワーカーモードで起動する"""
+    max_requests = MAX_REQUESTS or None
+    if max_requests and WORKERS > 1 and not _supports_worker_restart():
+        # 終了したワーカーが補充されず、ワーカーが減っていくため再起動しない
+        logger.warning("uvicorn %s ではワーカーを再起動できないため、MAX_REQUESTS を無効にします", uvicorn.__version__)
+        max_requests = None
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE,
+        log_level=LOG_LEVEL,
+    )
+
+if __name__ == "__main__":
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_uvicorn()
+    else:
+        run_gunicorn()
@@ -0,0 +1,86 @@
+# このファイルはバックエンドのテストで共有するフィクスチャを定義します
+#
+# アプリの読み込み前に一時ディレクトリのSQLiteデータベースを指定し、
+# 開発用の nurse_app.db やロックファイルに触れないようにします。
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+_work_dir = tempfile.mkdtemp(prefix="nurse_app_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_work_dir, 'test.db')}"
+os.environ["APP_LOCK_DIR"] = _work_dir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.dependencies import get_current_user
+from app.models.patient import Patient
+from app.models.user import User
+from app.patient_directory import patient_directory
+from main import app
+
+@pytest.fixture(scope="session")
+def user():
+    db = SessionLocal()
+    try:
+        user = User(username="nurse", email="nurse@example.com", hashed_password="x", is_active=True, is_admin=False)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+@pytest.fixture(scope="session")
+def client(user):
+    # 認証のユーザー検索を省き、ハンドラ自体が発行する文だけを数えられるようにする
+    app.dependency_overrides[get_current_user] = lambda: user
+    # 起動時のバックグラウンドタスクは不要なため、コンテキストマネージャーとしては使わない
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="session")
+def patient(client):
+    db = SessionLocal()
+    try:
+        row = Patient(patient_code="P0001", name="看護 花子", name_kana="カンゴ ハナコ", ward="3A", bed="301", is_active=True, created_at=datetime.now())
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        db.expunge(row)
+    finally:
+        db.close()
+    patient_directory.invalidate()
+    return row
+
+class StatementCounter:
+    """before_cursor_execute で実行された文を記録する"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@pytest.fixture
+def count_statements():
+    @contextmanager
+    def counting():
+        counter = StatementCounter()
+        event.listen(engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", counter)
+    return counting
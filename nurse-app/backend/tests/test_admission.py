@@ -0,0 +1,28 @@
+# このファイルは受付制御（ユーザーごとのレート制限）を検証します
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.dependencies import create_access_token
+from app.middleware.admission import AdmissionControlMiddleware
+
+async def endpoint(request):
+    return PlainTextResponse("ok")
+
+def _client(**limits) -> TestClient:
+    app = Starlette(routes=[Route("/items", endpoint, methods=["GET", "POST"])])
+    app.add_middleware(AdmissionControlMiddleware, **limits)
+    return TestClient(app)
+
+def _auth(username: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+def test_writes_are_rate_limited_per_user():
+    client = _client(rate=100, burst=100, write_rate=0.001, write_burst=3)
+    tablet, other = _auth("tablet"), _auth("other")
+    assert [client.post("/items", headers=tablet).status_code for _ in range(4)] == [200, 200, 200, 429]
+    # 他のユーザーの更新と、同じユーザーの参照は制限されない
+    assert client.post("/items", headers=other).status_code == 200
+    assert client.get("/items", headers=tablet).status_code == 200
@@ -0,0 +1,47 @@
+# このファイルは一括インポートのジョブ名（チェックポイントの再利用）を検証します
+
+import pytest
+
+from app.dependencies import get_current_admin_user
+from main import app
+
+HEADER = "patient_id,patient_name,medication,dose,route,scheduled_time,status"
+
+@pytest.fixture
+def admin_client(client, user):
+    app.dependency_overrides[get_current_admin_user] = lambda: user
+    yield client
+    del app.dependency_overrides[get_current_admin_user]
+
+def _upload(client, content: str):
+    return client.post("/api/import/injections", files={"file": ("mar.csv", content.encode(), "text/csv")}).json()
+
+def test_same_file_name_with_new_content_is_imported(admin_client, patient):
+    first = f"{HEADER}\n{patient.patient_code},看護 花子,セファゾリン,1g,静脈注射,2026-10-19T09:00:00,scheduled\n"
+    second = f"{HEADER}\n{patient.patient_code},看護 花子,セファゾリン,1g,静脈注射,2026-10-20T09:00:00,scheduled\n"
+
+    result = _upload(admin_client, first)
+    assert (result["inserted"], result["completed"]) == (1, True)
+    # 同じ内容の再送信は完了済みのジョブとして何も取り込まない
+    again = _upload(admin_client, first)
+    assert again["job_name"] == result["job_name"]
+    assert again["inserted"] == 1 and again["skipped"] == 0
+    # 同じファイル名でも内容が異なれば別のジョブとして取り込む
+    other = _upload(admin_client, second)
+    assert other["job_name"] != result["job_name"]
+    assert other["inserted"] == 1
+
+def test_malformed_interventions_rejects_only_that_row(admin_client, patient):
+    header = "patient_id,patient_name,problem,goal,interventions,start_date,target_date,status"
+    row = f"{patient.patient_code},看護 花子,転倒リスク,転倒しない,{{interventions}},2026-10-19T00:00:00,2026-10-26T00:00:00,active"
+    content = "\n".join([
+        header,
+        row.format(interventions='"[""ベッド柵の使用""]"'),
+        row.format(interventions="[bad"),
+        row.format(interventions="夜間の巡視|離床センサー"),
+    ])
+    response = admin_client.post("/api/import/nursing-plans", files={"file": ("plans.csv", content.encode(), "text/csv")})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["rejected"], result["completed"]) == (2, 1, True)
+    assert [reject["record"] for reject in result["rejects"]] == [2]
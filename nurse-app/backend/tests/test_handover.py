@@ -0,0 +1,57 @@
+# このファイルは申し送りレポートの保存と再生成対象の病棟の判定を検証します
+
+import json
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.handover import build_reports, changed_wards, shift_start_at, store_reports
+from app.models.handover_report import HandoverReport
+from app.patient_directory import patient_directory
+
+from test_write_statements import INJECTION
+
+def test_store_reports_replaces_existing_report(patient):
+    shift_start = shift_start_at(datetime(2020, 1, 6, 9, 0))
+    db = SessionLocal()
+    try:
+        older, newer = datetime.now(), datetime.now() + timedelta(seconds=1)
+        store_reports(db, shift_start, {"3A": {"ward": "3A", "patients": []}}, newer)
+        # 後から保存された古い生成結果は、新しいレポートを上書きしない
+        store_reports(db, shift_start, {"3A": {"ward": "3A", "patients": [], "stale": True}}, older)
+        rows = db.query(HandoverReport).filter(HandoverReport.shift_start == shift_start).all()
+        assert len(rows) == 1
+        assert rows[0].generated_at == newer
+        assert "stale" not in json.loads(rows[0].content)
+    finally:
+        db.close()
+
+def test_changed_wards_detects_deletions_and_transfers(client, patient):
+    shift_start = shift_start_at(datetime.now())
+    injection = client.post("/api/injections/", json={
+        **INJECTION, "patient_id": patient.patient_code, "scheduled_time": (shift_start + timedelta(hours=1)).isoformat(),
+    }).json()
+    transferred = client.post("/api/patients/", json={
+        "patient_code": "P0100", "name": "看護 次郎", "name_kana": "カンゴ ジロウ", "ward": "5B",
+    }).json()
+
+    db = SessionLocal()
+    try:
+        patient_directory.invalidate()
+        generated_at = datetime.now()
+        store_reports(db, shift_start, build_reports(db, shift_start, ["3A", "5B"]), generated_at)
+        assert changed_wards(db, generated_at, shift_start) == set()
+
+        # 削除された注射実施は、レポートに含まれている病棟を再生成する
+        assert client.delete(f"/api/injections/{injection['id']}").status_code == 204
+        assert changed_wards(db, generated_at, shift_start) == {"3A"}
+
+        # 転棟した患者は、転棟前と転棟後の両方の病棟を再生成する
+        since = datetime.now()
+        assert client.put(f"/api/patients/{transferred['patient_code']}", json={"ward": "6C"}).status_code == 200
+        assert changed_wards(db, since, shift_start) == {"5B", "6C"}
+    finally:
+        db.close()
+
+def test_offset_shift_start(client, patient):
+    response = client.get("/api/handover/3A", params={"shift_start": "2026-10-19T09:00:00+09:00"})
+    assert response.status_code == 200, response.text
@@ -0,0 +1,20 @@
+# このファイルは看護記録の日時の扱い（オフセット付きの日時）を検証します
+
+from datetime import datetime, timezone
+
+def test_offset_datetimes_are_converted_to_local_time(client, patient):
+    recorded_at = datetime(2026, 10, 19, 0, 0, tzinfo=timezone.utc)
+    response = client.post("/api/nursing-records/", json={
+        "patient_id": patient.patient_code, "content": "バイタル安定", "recorded_at": recorded_at.isoformat(),
+    })
+    assert response.status_code == 201, response.text
+    local = recorded_at.astimezone().replace(tzinfo=None)
+    assert datetime.fromisoformat(response.json()["recorded_at"]) == local
+
+    response = client.get("/api/nursing-records/", params={
+        "patient_id": patient.patient_code,
+        "since": "2026-10-18T09:00:00+09:00",
+        "until": "2026-10-20T09:00:00+09:00",
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["records"][0]["content"] == "バイタル安定"
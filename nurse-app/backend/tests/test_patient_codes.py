@@ -0,0 +1,41 @@
+# このファイルは患者コードの検証（未登録の患者への書き込みの拒否）を検証します
+
+import io
+
+from app.bulk_import import run_import
+from app.database import SessionLocal
+
+from test_write_statements import INJECTION, NURSING_PLAN
+
+def test_create_with_unknown_patient(client, patient):
+    response = client.post("/api/injections/", json={**INJECTION, "patient_id": "UNKNOWN"})
+    assert response.status_code == 400
+    response = client.post("/api/nursing-plans/", json={**NURSING_PLAN, "patient_id": "UNKNOWN"})
+    assert response.status_code == 400
+
+def test_update_to_unknown_patient(client, patient):
+    created = client.post("/api/injections/", json={**INJECTION, "patient_id": patient.patient_code}).json()
+    response = client.put(f"/api/injections/{created['id']}", json={"patient_id": "UNKNOWN"})
+    assert response.status_code == 400
+    assert client.get(f"/api/injections/{created['id']}").json()["patient_id"] == patient.patient_code
+
+def test_import_rejects_unknown_patient_rows(user, patient):
+    lines = [
+        "patient_id,patient_name,medication,dose,route,scheduled_time,status",
+        f"{patient.patient_code},看護 花子,セファゾリン,1g,静脈注射,2026-10-19T09:00:00,scheduled",
+        "UNKNOWN,不明,セファゾリン,1g,静脈注射,2026-10-19T09:00:00,scheduled",
+        f"{patient.patient_code},看護 花子,セファゾリン,1g,静脈注射,2026-10-19T21:00:00,scheduled",
+    ]
+    rejects = []
+    db = SessionLocal()
+    try:
+        result = run_import(
+            db, io.StringIO("\n".join(lines)), "injections", "csv", user.id,
+            job_name="test-unknown-patient", chunk_size=10,
+            on_reject=lambda number, raw, error: rejects.append(number),
+        )
+    finally:
+        db.close()
+    assert result.completed
+    assert (result.inserted, result.rejected) == (2, 1)
+    assert rejects == [2]
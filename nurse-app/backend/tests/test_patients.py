@@ -0,0 +1,39 @@
+# このファイルは患者の削除（記録の残る患者の保護）を検証します
+
+from app.database import SessionLocal
+from app.models.vital_signs import VitalSign
+
+def _create_patient(client, code: str) -> dict:
+    response = client.post("/api/patients/", json={
+        "patient_code": code, "name": "看護 三郎", "name_kana": "カンゴ サブロウ", "ward": "7A",
+    })
+    assert response.status_code == 201
+    return response.json()
+
+def test_delete_patient_without_records(client):
+    _create_patient(client, "P0300")
+    assert client.delete("/api/patients/P0300").status_code == 204
+    assert client.get("/api/patients/P0300").status_code == 404
+
+def test_delete_patient_with_vital_signs_is_rejected(client):
+    patient = _create_patient(client, "P0301")
+    vital = client.post("/vital-signs/", json={
+        "patient_id": patient["id"], "vital_type": "temperature", "value": 36.5, "unit": "°C",
+    }).json()
+
+    assert client.delete("/api/patients/P0301").status_code == 409
+    assert client.get("/api/patients/P0301").status_code == 200
+    db = SessionLocal()
+    try:
+        assert db.query(VitalSign.patient_id).filter(VitalSign.id == vital["id"]).scalar() == patient["id"]
+    finally:
+        db.close()
+
+def test_delete_patient_with_nursing_records_is_rejected(client):
+    _create_patient(client, "P0302")
+    response = client.post("/api/nursing-records/", json={
+        "patient_id": "P0302", "record_type": "観察記録", "content": "夜間良眠",
+        "recorded_at": "2026-10-19T03:00:00",
+    })
+    assert response.status_code == 201, response.text
+    assert client.delete("/api/patients/P0302").status_code == 409
@@ -0,0 +1,37 @@
+# このファイルはプロファイルの保存先（ワーカー間での共有）を検証します
+
+from app.middleware.profiling import ProfileStore, RequestProfile, folded_stacks
+
+def _profile(profile_id: str, path: str) -> RequestProfile:
+    # 同じプロセス内で複数のワーカーを模すため、IDはプロセスIDの異なる形で指定する
+    profile = RequestProfile("GET", path, "header", "admin")
+    profile.id = profile_id
+    profile.status_code = 200
+    profile.duration_ms = 1.0
+    profile.stacks["main.py:handler;crud.py:insert_returning"] += 3
+    return profile
+
+def test_profile_is_readable_from_another_worker(tmp_path):
+    worker_a, worker_b = ProfileStore(str(tmp_path)), ProfileStore(str(tmp_path))
+    profile = _profile("20261019090000-101-1", "/api/injections/")
+    worker_a.save(profile)
+
+    saved = worker_b.get(profile.id)
+    assert saved["path"] == "/api/injections/"
+    assert folded_stacks(saved) == "main.py:handler;crud.py:insert_returning 3\n"
+    assert [summary["id"] for summary in worker_b.summaries()] == [profile.id]
+    assert "stacks" not in worker_b.summaries()[0]
+
+def test_old_profiles_are_removed_across_workers(tmp_path):
+    worker_a, worker_b = ProfileStore(str(tmp_path), size=2), ProfileStore(str(tmp_path), size=2)
+    first = _profile("20261019090000-101-1", "/first")
+    worker_a.save(first)
+    worker_b.save(_profile("20261019090000-102-1", "/second"))
+    worker_a.save(_profile("20261019090001-101-2", "/third"))
+    assert worker_b.get(first.id) is None
+    assert len(worker_b.summaries()) == 2
+
+def test_invalid_profile_id(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    assert store.get("../../etc/passwd") is None
+    assert store.get("") is None
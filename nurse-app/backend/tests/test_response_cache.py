@@ -0,0 +1,77 @@
+# このファイルはレスポンスキャッシュの無効化と読み込みの競合を検証します
+
+from app.response_cache import LocalBackend, RedisBackend, ResponseCache
+
+class FakeRedis:
+    """RedisBackend が使う操作だけを持つ、テスト用のインメモリのRedis"""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def register_script(self, script):
+        def set_if_generation(keys, args):
+            value_key, generation_key = keys
+            value, generation, _ = args
+            if (self.data.get(generation_key) or b"") == generation:
+                self.data[value_key] = value
+                return 1
+            return 0
+        return set_if_generation
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append(lambda data: data.__setitem__(key, str(int(data.get(key) or 0) + 1).encode()))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.commands.append(lambda data: data.pop(key, None))
+
+    def execute(self):
+        for command in self.commands:
+            command(self.redis.data)
+
+def _shared_caches():
+    """同じRedisを共有する2つのワーカーのキャッシュ"""
+    redis = FakeRedis()
+    caches = []
+    for _ in range(2):
+        backend = RedisBackend.__new__(RedisBackend)
+        backend.client = redis
+        backend.ttl = 300
+        backend.set_if_generation = redis.register_script(RedisBackend.SET_IF_GENERATION)
+        cache = ResponseCache(backend_name="off")
+        cache.backend = backend
+        caches.append(cache)
+    return caches
+
+def test_invalidation_in_another_worker_is_not_overwritten():
+    worker_a, worker_b = _shared_caches()
+    # ワーカーAが読み込みを始めた後に、ワーカーBが更新して無効化する
+    value, token = worker_a.get("injections", 1)
+    assert value is None
+    worker_b.invalidate("injections", 1)
+    worker_a.set("injections", 1, b'{"version": 1}', token)
+    assert worker_b.get("injections", 1)[0] is None
+
+    # 無効化の後に読み込んだ内容は保存される
+    value, token = worker_a.get("injections", 1)
+    worker_a.set("injections", 1, b'{"version": 2}', token)
+    assert worker_b.get("injections", 1)[0] == b'{"version": 2}'
+
+def test_local_ttl_follows_worker_count(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert LocalBackend(ResponseCache(backend_name="off").stats).ttl == 5.0
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    assert LocalBackend(ResponseCache(backend_name="off").stats).ttl == 0.0
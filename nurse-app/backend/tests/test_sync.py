@@ -0,0 +1,25 @@
+# このファイルは差分同期（変更連番順の作成・更新・削除）を検証します
+
+from test_write_statements import INJECTION
+
+def test_changes_are_returned_in_sequence_order(client, patient):
+    cursor = client.get("/api/injections/changes").json()["cursor"]
+    kept = client.post("/api/injections/", json={**INJECTION, "patient_id": patient.patient_code}).json()
+    removed = client.post("/api/injections/", json={**INJECTION, "patient_id": patient.patient_code}).json()
+    client.put(f"/api/injections/{removed['id']}", json={"dose": "2g"})
+    assert client.delete(f"/api/injections/{removed['id']}").status_code == 204
+    client.put(f"/api/injections/{kept['id']}", json={"dose": "3g"})
+
+    page = client.get("/api/injections/changes", params={"since": cursor}).json()
+    changes = page["changes"]
+    assert [change["change_seq"] for change in changes] == sorted(change["change_seq"] for change in changes)
+    assert [(change["id"], change["deleted"]) for change in changes] == [(removed["id"], True), (kept["id"], False)]
+    assert changes[0]["record"] is None
+    assert changes[1]["record"]["dose"] == "3g"
+    assert page["cursor"] == changes[-1]["change_seq"]
+
+    # ページの途中で区切っても、続きのカーソルから取りこぼしなく取得できる
+    first = client.get("/api/injections/changes", params={"since": cursor, "limit": 1}).json()
+    assert first["has_more"]
+    rest = client.get("/api/injections/changes", params={"since": first["cursor"]}).json()
+    assert first["changes"] + rest["changes"] == changes
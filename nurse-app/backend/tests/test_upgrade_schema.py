@@ -0,0 +1,34 @@
+# このファイルは以前のバージョンで作成されたデータベースの更新を検証します
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, upgrade_schema
+
+# 最初のバージョンの injections テーブル（version, change_seq を持たない）
+LEGACY_INJECTIONS = """
+CREATE TABLE injections (
+    id INTEGER NOT NULL PRIMARY KEY,
+    patient_id VARCHAR, patient_name VARCHAR, medication VARCHAR, dose VARCHAR, route VARCHAR,
+    scheduled_time DATETIME, administered_time DATETIME, administered_by VARCHAR, status VARCHAR,
+    notes TEXT, created_by_id INTEGER, created_at DATETIME, updated_by_id INTEGER, updated_at DATETIME
+)
+"""
+
+def test_upgrade_adds_missing_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_INJECTIONS))
+        connection.execute(text("INSERT INTO injections (id, patient_id, status) VALUES (1, 'P1', 'scheduled'), (2, 'P2', 'scheduled')"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    # 2回目は何も変更しない
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+
+    inspector = inspect(engine)
+    assert {"version", "change_seq"} <= {column["name"] for column in inspector.get_columns("injections")}
+    assert "ix_injections_change_seq" in {index["name"] for index in inspector.get_indexes("injections")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id, version, change_seq FROM injections ORDER BY id")).all() == [(1, 1, 1), (2, 1, 2)]
+        assert connection.execute(text("SELECT value FROM sync_counters WHERE name = 'injections'")).scalar() == 2
@@ -0,0 +1,134 @@
+# このファイルは書き込み系エンドポイントが発行するSQL文の数を検証します
+#
+# 書き込みとレスポンス用の行の取得は1文（RETURNING）で行い、差分同期の対象テーブルでは
+# 変更連番の採番（カウンターのUPDATE）が1文加わります。削除では削除記録のINSERTと
+# その採番がさらに加わります。認証のユーザー検索は conftest で省いています。
+
+import pytest
+
+INJECTION = {
+    "patient_name": "看護 花子",
+    "medication": "セファゾリン",
+    "dose": "1g",
+    "route": "静脈注射",
+    "scheduled_time": "2026-10-19T09:00:00",
+    "status": "scheduled",
+}
+
+NURSING_PLAN = {
+    "patient_name": "看護 花子",
+    "problem": "転倒リスク",
+    "goal": "入院中に転倒しない",
+    "interventions": ["ベッド柵の使用", "夜間の巡視"],
+    "start_date": "2026-10-19T00:00:00",
+    "target_date": "2026-10-26T00:00:00",
+    "status": "active",
+}
+
+@pytest.fixture
+def injection(client, patient):
+    response = client.post("/api/injections/", json={**INJECTION, "patient_id": patient.patient_code})
+    assert response.status_code == 201
+    return response.json()
+
+@pytest.fixture
+def nursing_plan(client, patient):
+    response = client.post("/api/nursing-plans/", json={**NURSING_PLAN, "patient_id": patient.patient_code})
+    assert response.status_code == 201
+    return response.json()
+
+def test_create_injection(client, patient, injection, count_statements):
+    # カウンターの行は初回の作成時に作られるため、フィクスチャで作成してから数える
+    with count_statements() as counter:
+        response = client.post("/api/injections/", json={**INJECTION, "patient_id": patient.patient_code})
+    assert response.status_code == 201
+    assert counter.count == 2  # 採番 + INSERT ... RETURNING
+
+def test_update_injection(client, injection, count_statements):
+    with count_statements() as counter:
+        response = client.put(f"/api/injections/{injection['id']}", json={"dose": "2g"}, params={"version": injection["version"]})
+    assert response.status_code == 200
+    assert response.json()["version"] == injection["version"] + 1
+    assert counter.count == 2  # 採番 + UPDATE ... RETURNING
+
+def test_administer_injection(client, injection, count_statements):
+    with count_statements() as counter:
+        response = client.post(f"/api/injections/{injection['id']}/administer", json={
+            "administered_time": "2026-10-19T09:05:00",
+            "administered_by": "nurse",
+        })
+    assert response.status_code == 200
+    assert response.json()["status"] == "administered"
+    assert counter.count == 2  # 採番 + UPDATE ... RETURNING
+
+def test_delete_injection(client, injection, count_statements):
+    with count_statements() as counter:
+        response = client.delete(f"/api/injections/{injection['id']}")
+    assert response.status_code == 204
+    assert counter.count == 3  # DELETE + 採番 + 削除記録のINSERT
+
+def test_create_nursing_plan(client, patient, nursing_plan, count_statements):
+    with count_statements() as counter:
+        response = client.post("/api/nursing-plans/", json={**NURSING_PLAN, "patient_id": patient.patient_code})
+    assert response.status_code == 201
+    assert counter.count == 2
+
+def test_update_nursing_plan(client, nursing_plan, count_statements):
+    with count_statements() as counter:
+        response = client.put(f"/api/nursing-plans/{nursing_plan['id']}", json={"goal": "転倒しない"})
+    assert response.status_code == 200
+    assert counter.count == 2
+
+@pytest.mark.parametrize("action", ["complete", "cancel"])
+def test_transition_nursing_plan(client, nursing_plan, count_statements, action):
+    with count_statements() as counter:
+        response = client.put(f"/api/nursing-plans/{nursing_plan['id']}/{action}")
+    assert response.status_code == 200
+    assert counter.count == 2
+
+def test_delete_nursing_plan(client, nursing_plan, count_statements):
+    with count_statements() as counter:
+        response = client.delete(f"/api/nursing-plans/{nursing_plan['id']}")
+    assert response.status_code == 204
+    assert counter.count == 3
+
+def test_create_and_update_patient(client, count_statements):
+    # 患者は差分同期の対象外のため、採番は行われない
+    with count_statements() as counter:
+        response = client.post("/api/patients/", json={
+            "patient_code": "P0002", "name": "看護 太郎", "name_kana": "カンゴ タロウ", "ward": "3A",
+        })
+    assert response.status_code == 201
+    assert counter.count == 1
+
+    with count_statements() as counter:
+        response = client.put("/api/patients/P0002", json={"bed": "302"})
+    assert response.status_code == 200
+    assert counter.count == 1
+
+def test_create_vital_sign(client, patient, count_statements):
+    vital = {"patient_id": patient.id, "vital_type": "pulse", "value": 140, "unit": "bpm"}
+    # 初回は早期警告スコアの状態を読み込むため、2回目以降を数える
+    assert client.post("/vital-signs/", json=vital).status_code == 200
+    with count_statements() as counter:
+        response = client.post("/vital-signs/", json=vital)
+    assert response.status_code == 200
+    # 他のワーカーの測定値の取り込み + INSERT ... RETURNING（スコアは変わらないため記録しない）
+    assert counter.count == 2
+
+def test_register_user(client, count_statements):
+    with count_statements() as counter:
+        response = client.post("/register", json={
+            "username": "nurse2", "email": "nurse2@example.com", "password": "secret", "full_name": "看護 二郎",
+        })
+    assert response.status_code == 201, response.text
+    assert response.json()["username"] == "nurse2"
+    assert counter.count == 2  # ユーザー名・メールアドレスの重複確認 + INSERT ... RETURNING
+
+    # 重複時は確認の1文だけで拒否する
+    with count_statements() as counter:
+        response = client.post("/register", json={
+            "username": "nurse3", "email": "nurse2@example.com", "password": "secret",
+        })
+    assert response.status_code == 400
+    assert counter.count == 1